@@ -0,0 +1,426 @@
+# Purpose: Vectorized LCOE calculation of many scenarios in one pass.
+#
+# The formulas are the ones of lcoe_calc.py, but instead of pandas column
+# operations on one long data frame every quantity is a NumPy array shaped
+# (scenario, source, year). Summing over the year axis gives the discounted
+# sums of each generation, from which the LCOE of every scenario follows.
+# The inputs come from the compact Model of model.py.
+
+import numpy as np
+from escalation import (as_float, discount_factors, fuel_factors_real, inflation_factors,
+                        om_factors)
+from model import Model, model_from_inputs
+from instrument import stage
+
+# pandas is imported by the functions taking or returning data frames,
+# so that evaluate() on a Model needs NumPy only (see lcoe.py)
+
+
+################# GENERAL SETTINGS ##################
+
+# General inputs which may vary across scenarios (columns named as in general.csv)
+general_params = ['wacc', 'tax', 'inf', 'om_real']
+
+# Scalar inputs of each generation which may vary across scenarios.
+# A scenario column named '<source>:<param>' (e.g. 'nuclear:on_c') overrides
+# the input of that generation and of the generations built from it, as an
+# edit of its csv file would: overriding a renewable (e.g. 'solar:cap_fac')
+# also changes its hybrid-source generations ('solar_hybrid'), and
+# overriding 'gas (advanced ct)' changes the backup source of every
+# hybrid-source generation. A column of the hybrid-source generation itself
+# (e.g. 'solar_hybrid:cap_fac') overrides it alone and takes precedence.
+# The inputs of hybrid_params come from the *_aux.csv file of the hybrid,
+# not from its renewable, so their overrides never pass on.
+# For the fuels with the EIA projection (coal, gas and nuclear, see
+# escalation.py) fl_c is the start year price of the fuel price schedule and
+# the fl_c of the csv file is not used: an override of fl_c scales the whole
+# price path, as scaling the *_fuel_price_schedule.csv file would.
+# A NaN value leaves the input of that scenario as if the column were not
+# there, so scenarios setting different inputs can share one table.
+source_params = ['cap', 'cap_fac', 'fx_om_c', 'heat_rate', 'kgCO2 per MWh',
+                 'on_c', 'trans_cost', 'vr_om_c', 'waste_fee', 'non_carbon_c',
+                 'leak_rate', 'fl_c', 'fl_real', 'equiv_cap', 'equiv_cap_fac',
+                 'hybrid_tax', 'hybrid_wacc']
+
+# Inputs of the hybrid-source generations only
+hybrid_params = ['equiv_cap', 'equiv_cap_fac', 'hybrid_tax', 'hybrid_wacc']
+
+# Columns of the LCOE results, as in all_lcoe_results.csv
+lcoe_cols = ['Capital', 'Fixed O&M', 'Variable O&M', 'Fuel', 'Carbon', 'Methane',
+             'Transmission', 'Non-GHG External Costs', 'Effective SCC',
+             'Effective SCM', 'LCOE base', 'GHG External Costs',
+             'LCOE w/ Total Social Costs']
+
+# Hours in a year
+hours = 8766
+
+
+# Model of the batch calculation: the Model itself, or the
+# Model of the escalated inputs returned by load_inputs()
+def prepare(inputs):
+    return inputs if isinstance(inputs, Model) else model_from_inputs(inputs)
+
+
+# Check the scenario table and split its columns into general inputs,
+# shape (scenario,), and per-generation overrides {param: [(source index, values)]}
+def scenario_columns(model, scenarios):
+    if scenarios is None:
+        return {}, {}, 1
+    import pandas as pd
+    scenarios = pd.DataFrame(scenarios)
+    general   = {}
+    overrides = {}
+    for col in scenarios.columns:
+        values = as_float(scenarios[col].to_numpy())
+        if col in general_params:
+            general[col] = np.where(np.isnan(values), float(model.general_inputs[col]), values)
+            continue
+        name, _, param = str(col).rpartition(':')
+        if param not in source_params or name not in model.sources:
+            raise ValueError('Unknown scenario parameter: %r' % (col,))
+        overrides.setdefault(param, []).append((model.sources.index(name), values))
+
+    # Overrides of a renewable apply to its hybrid-source generations first,
+    # so that overrides of the hybrid-source generations themselves win
+    # (except in the scenarios where they are NaN)
+    for param, lst in overrides.items():
+        if param not in hybrid_params:
+            lst[:0] = [(j, values) for i, values in lst
+                       for j in np.flatnonzero(model.renewable == i)]
+    return general, overrides, len(scenarios)
+
+
+################### BATCH CALCULATION ###################
+
+# Evaluate the LCOE of every generation in every scenario.
+# 'scenarios' is a data frame (or dict of columns) with one row per scenario,
+# see general_params and source_params for the accepted columns.
+# Returns a dictionary of (scenario, source) arrays, one per column of lcoe_cols,
+# for the generations in model.names. Scenarios are evaluated 'chunk_size' at a
+# time so that the (scenario, source, year) arrays stay small.
+def evaluate(model, scenarios=None, chunk_size=1024):
+    general, overrides, n = scenario_columns(model, scenarios)
+    # Complex scenario values (see sensitivity.py) give complex results
+    dtype   = np.result_type(float, *general.values(),
+                             *(v for lst in overrides.values() for _, v in lst))
+    results = {col: np.empty((n, len(model.names)), dtype=dtype) for col in lcoe_cols}
+    for lo in range(0, n, chunk_size):
+        hi = min(lo + chunk_size, n)
+        chunk_general   = {k: v[lo:hi] for k, v in general.items()}
+        chunk_overrides = {k: [(i, v[lo:hi]) for i, v in lst]
+                           for k, lst in overrides.items()}
+        with stage('batch_chunk') as span:
+            out = evaluate_chunk(model, chunk_general, chunk_overrides, hi - lo)
+            span.record(rows=hi - lo, cols=len(model.sources))
+        for col in lcoe_cols:
+            results[col][lo:hi] = out[col][:, :len(model.names)]
+    return results
+
+
+# WACC of every generation, (scenario, source): hybrid_wacc for
+# hybrid-source generations, the general wacc for the others
+def source_wacc(model, g, p):
+    return np.where(model.hybrid, p['hybrid_wacc'][..., 0], g['wacc'][..., 0])
+
+
+# Groups of generations with the same discounted sums: the same schedules
+# and fuel escalation, and the same WACC and fl_real in every scenario (a
+# hybrid-source generation and its renewable usually are one group).
+# Returns (rows, inverse): one generation of each group, and the group of
+# every generation, so that sums[:, inverse] are the sums of all generations.
+def sum_groups(model, g, p):
+    wacc    = source_wacc(model, g, p)
+    fl_real = p['fl_real'][..., 0]
+    shape   = np.broadcast_shapes(wacc.shape, fl_real.shape, (1, len(model.sources)))
+    wacc, fl_real = np.broadcast_to(wacc, shape), np.broadcast_to(fl_real, shape)
+    keys = np.column_stack([model.sum_keys, wacc.T, fl_real.T])
+    # Number the groups in the order of their first generation
+    groups  = {}
+    inverse = np.array([groups.setdefault(key.tobytes(), len(groups)) for key in keys])
+    rows    = np.unique(inverse, return_index=True)[1]
+    return rows, inverse
+
+
+# Escalation factors and discount factors of the generations 'rows', as
+# (scenario, source, year) arrays (axes of length 1 are broadcast).
+# The fuel escalation factor is returned relative to inflation
+# (fl = inf * fl_rel), which keeps the scenario axis out of fl_rel
+# unless fl_real itself varies across scenarios. The discount factors are
+# 0 after the last year of generations with a shorter life (model.end_index).
+def escalation_arrays(model, g, p, rows=slice(None)):
+    n_years = len(model.years)
+    inf    = inflation_factors(g['inf'][..., 0], n_years)
+    om     = om_factors(g['inf'][..., 0], g['om_real'][..., 0], n_years)
+    fl_rel = fuel_factors_real(p['fl_real'][:, rows, 0], model.shift[rows],
+                               model.fuel_rel[rows], n_years)
+    disc   = discount_factors(source_wacc(model, g, p)[:, rows], n_years)
+    if model.end_index is not None:
+        disc = disc * (np.arange(n_years) <= model.end_index[rows, None])
+    return inf, om, fl_rel, disc
+
+
+# Sum over the years of a (scenario, source, year) array times a
+# (scenario, 1, year) array, as a (scenario, source) array
+def year_dot(a, b):
+    return (a @ np.swapaxes(b, -1, -2))[..., 0]
+
+
+# Sums over the years of disc (the discount factors) times the escalation
+# factors, each weighted by the (source, year) array 'weight'. 'disc' and
+# 'fl_rel' are the arrays of the generations, the others are shared.
+def weighted_sums(weight, disc, inf_op, om_op, fl_rel, op):
+    disc = disc * weight
+    return {'disc':     disc @ op,
+            'disc_inf': year_dot(disc, inf_op),
+            'disc_om':  year_dot(disc, om_op),
+            'disc_fl':  year_dot(disc * fl_rel, inf_op)}
+
+
+# Sums of the output-dependent costs, (scenario, source) arrays:
+#   'cf_<sum>'  the sums weighted by the capacity factor of each generation,
+#               cap_fac times the sums, or with an hourly profile (see
+#               profiles.py) cap_fac times the sums weighted by the yearly
+#               capacity factor relative to cap_fac (model.cf_shape)
+#   'bcf_<sum>' of each hybrid-source generation with a yearly backup
+#               dispatch (model.backup_cf_sched), the sums weighted by the
+#               dispatch: with the hybrid's discount factors for the output
+#               and the backup's for its O&M and fuel, (scenario, hybrid)
+def cf_sums(model, s, cap_fac, inverse, disc, inf_op, om_op, fl_rel, op):
+    cf = {'cf_' + k: cap_fac * s[k] for k in ['disc', 'disc_inf', 'disc_om', 'disc_fl']}
+    if model.cf_shape is not None:
+        j = np.flatnonzero(~np.isnan(model.cf_shape[:, 0]))
+        weighted = weighted_sums(model.cf_shape[j], disc[:, inverse[j]], inf_op, om_op,
+                                 fl_rel[:, inverse[j]], op)
+        for k, v in weighted.items():
+            v = cap_fac[..., j] * v
+            shape = np.broadcast_shapes(np.shape(cf['cf_' + k]), v.shape[:-1] + (len(inverse),))
+            cf['cf_' + k] = np.array(np.broadcast_to(cf['cf_' + k], shape),
+                                     dtype=np.result_type(cf['cf_' + k], v))
+            cf['cf_' + k][:, j] = v
+    if model.backup_cf_sched is not None:
+        h = np.flatnonzero(model.hybrid)
+        b = model.backup[h]
+        dispatch = np.nan_to_num(model.backup_cf_sched[h])
+        hyb = weighted_sums(dispatch, disc[:, inverse[h]], inf_op, om_op, fl_rel[:, inverse[h]], op)
+        bak = weighted_sums(dispatch, disc[:, inverse[b]], inf_op, om_op, fl_rel[:, inverse[b]], op)
+        cf['bcf_disc_inf'] = hyb['disc_inf']
+        cf['bcf_disc']     = bak['disc']
+        cf['bcf_disc_om']  = bak['disc_om']
+        cf['bcf_disc_fl']  = bak['disc_fl']
+    return cf
+
+
+# Evaluate one chunk of n scenarios
+def evaluate_chunk(model, general, overrides, n):
+    # General inputs as (scenario, 1, 1) arrays
+    g = {k: np.reshape(general.get(k, float(model.general_inputs[k])), (-1, 1, 1))
+         for k in general_params}
+    # Generation inputs as (scenario, source, 1) arrays
+    p = {}
+    for k in source_params:
+        value = model.params[k][None, :]
+        if k in overrides:
+            dtype = np.result_type(value, *(v for _, v in overrides[k]))
+            value = np.repeat(value.astype(dtype), n, axis=0)
+            for i, v in overrides[k]:
+                value[:, i] = np.where(np.isnan(v), value[:, i], v)
+        p[k] = value[..., None]
+
+    # The sums are computed once per group of generations with the same
+    # inputs (see sum_groups()) and shared by the members of the group
+    rows, inverse = sum_groups(model, g, p)
+    inf, om, fl_rel, disc = escalation_arrays(model, g, p, rows)
+    sched = {k: model.schedule(k)[rows] for k in model.schedules}
+
+    # Only years after the p0 year (2023) count for operation,
+    # O&M, fuel and social costs
+    op = (model.years > model.general_inputs['period_0_yr']).astype(float)
+    inf_op = inf * op
+
+    # Discounted sums over the years, (scenario, source) arrays
+    s = {}
+    s['disc']     = disc @ op
+    s['disc_inf'] = year_dot(disc, inf_op)
+    s['disc_inf_scc'] = year_dot(disc * sched['carb_sched'], inf_op)
+    s['disc_inf_scm'] = year_dot(disc * sched['meth_sched'], inf_op)
+    s['disc_om']  = year_dot(disc, om * op)
+    s['disc_fl']  = year_dot(disc * fl_rel, inf_op)
+    s['cnstr_inf'] = year_dot(sched['constr_sched'], inf)
+    s['disc_cnstr_inf'] = year_dot(disc * sched['constr_sched'], inf)
+    s['disc_depr'] = np.einsum('...y,...y->...', disc, sched['depr_sched'])
+    if model.end_index is None:
+        s['disc_inf_end'] = disc[..., -1] * inf[..., -1]
+    else:
+        end = model.end_index[rows]
+        s['disc_inf_end'] = disc[:, np.arange(len(end)), end] * inf[:, 0, end]
+    s = {k: v[:, inverse] for k, v in s.items()}
+
+    p   = {k: v[..., 0] for k, v in p.items()}
+    tax = g['tax'][..., 0] / 100.0
+    cap = p['cap']
+    cap_fac = p['cap_fac'] / 100.0
+
+    # Sums weighted by the capacity factor of every year
+    s.update(cf_sums(model, s, cap_fac, inverse, disc, inf_op, om * op, fl_rel, op))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out, c = single_source_lcoe(model, s, p, tax, cap)
+        if model.hybrid.any():
+            hybrid_source_lcoe(model, s, p, c, tax, cap, cap_fac, out)
+    return {col: np.broadcast_to(out[col], (n, len(model.sources)))
+            for col in lcoe_cols}
+
+
+############## SINGLE-SOURCE GENERATION LCOE ###############
+
+# LCOE results of every generation calculated as a single source, and
+# the discounted costs 'c' they are based on
+def single_source_lcoe(model, s, p, tax, cap):
+    c = {}
+    c['s_op']   = (1-tax) * cap * s['cf_disc_inf'] * hours * (10 ** -6)
+    c['s_c']    = cap * p['on_c'] * (s['disc_cnstr_inf'] -
+                  tax * s['cnstr_inf'] * s['disc_depr']) * (10 ** -3)
+    c['s_om_f'] = (1-tax) * cap * p['fx_om_c'] * s['disc_om'] * (10 ** -3)
+    c['s_om_v'] = (1-tax) * cap * p['vr_om_c'] * s['cf_disc_om'] * hours * (10 ** -6)
+    c['s_f']    = (1-tax) * cap * p['fl_c'] * p['heat_rate'] \
+                  * s['cf_disc_fl'] * hours * (10 ** -9)
+    # Waste cost (nonzero only for nuclear)
+    c['s_f']    = c['s_f'] + (1-tax) * cap * p['waste_fee'] * s['cf_disc'] * hours * (10 ** -3)
+
+    # Decommissioning cost (only for nuclear)
+    c['s_c'] = c['s_c'] + model.decom * (1-tax) * s['disc_inf_end'] * p['on_c'] * 0.175
+
+    out = {}
+    out['Capital']      = c['s_c'] / c['s_op'] / 10
+    out['Fixed O&M']    = c['s_om_f'] / c['s_op'] / 10
+    out['Variable O&M'] = c['s_om_v'] / c['s_op'] / 10
+    out['Fuel']         = c['s_f'] / c['s_op'] / 10
+    out['Carbon']       = s['disc_inf_scc'] * p['kgCO2 per MWh'] / s['disc_inf'] * (10 ** -4)
+    # Need to use 10^(-9) not 10^(-7) because of how percentages are coded
+    out['Methane']      = (s['disc_inf_scm'] * p['leak_rate'] * p['heat_rate'] /
+                           s['disc_inf']) * (10 ** -9) * 0.96899 * 19.3
+    out['Transmission'] = p['trans_cost']
+    out['Non-GHG External Costs'] = p['non_carbon_c']
+    out['Effective SCC'] = s['disc_inf_scc'] / s['disc_inf']
+    out['Effective SCM'] = s['disc_inf_scm'] / s['disc_inf']
+    finish(out)
+    return out, c
+
+
+############### HYBRID-SOURCE GENERATION LCOE ###############
+
+# Overwrite the results of the hybrid-source generations in 'out'.
+# The renewable part is the single-source calculation 'c' of the hybrid row,
+# the backup part uses the sums of the hybrid's backup source (model.backup).
+def hybrid_source_lcoe(model, s, p, c, tax, cap, cap_fac, out):
+    h = np.flatnonzero(model.hybrid)
+    b = model.backup[h]
+    bcf = {k: s.pop(k) for k in list(s) if k.startswith('bcf_')}
+    shape = np.broadcast_shapes(*(np.shape(v) for v in s.values()),
+                                *(np.shape(v) for v in p.values()), np.shape(tax))
+    s = {k: np.broadcast_to(v, shape) for k, v in s.items()}
+    p = {k: np.broadcast_to(v, shape) for k, v in p.items()}
+    c = {k: np.broadcast_to(v, shape)[:, h] for k, v in c.items()}
+    tax = np.broadcast_to(tax, shape)
+
+    # Hybrid tax (falls back to the general tax if it is not set)
+    h_tax = np.where(np.real(p['hybrid_tax'][:, h]) != 0, p['hybrid_tax'][:, h] / 100, tax[:, h])
+
+    cap, cap_fac = np.broadcast_to(cap, shape)[:, h], np.broadcast_to(cap_fac, shape)[:, h]
+    b_cap     = p['cap'][:, b]
+    b_cap_fac = p['cap_fac'][:, b] / 100.0
+    # Mean backup capacity factor, pct to decimal
+    b_cf_mean = ((p['equiv_cap'][:, h] * p['equiv_cap_fac'][:, h] / 100.0 -
+                  cap * cap_fac) / b_cap)
+
+    # Backup output, O&M and fuel sums: the mean capacity factor times the
+    # sums, or the sums weighted by the yearly dispatch (see cf_sums())
+    b_disc_inf = b_cf_mean * s['disc_inf'][:, h]
+    b_disc_om  = b_cf_mean * s['disc_om'][:, b]
+    b_disc_fl  = b_cf_mean * s['disc_fl'][:, b]
+    b_disc     = b_cf_mean * s['disc'][:, b]
+    if bcf:
+        dispatch   = model.backup_cf_sched[h]
+        profiled   = ~np.isnan(dispatch[:, 0])
+        b_disc_inf = np.where(profiled, bcf['bcf_disc_inf'], b_disc_inf)
+        b_disc     = np.where(profiled, bcf['bcf_disc'], b_disc)
+        b_disc_om  = np.where(profiled, bcf['bcf_disc_om'], b_disc_om)
+        b_disc_fl  = np.where(profiled, bcf['bcf_disc_fl'], b_disc_fl)
+        # The mean over the years of operation weights the social costs
+        op = model.years > model.general_inputs['period_0_yr']
+        b_cf_mean = np.where(profiled, dispatch[:, op].mean(axis=1), b_cf_mean)
+
+    # Backup source calc and costs. Backup capital, O&M and fuel costs are
+    # discounted with the backup's own discount factors
+    b_op   = (1-h_tax) * b_cap * b_disc_inf * hours * (10 ** -6)
+    b_c    = b_cap * p['on_c'][:, b] * (s['disc_cnstr_inf'][:, b] -
+             h_tax * s['cnstr_inf'][:, b] * s['disc_depr'][:, b]) * (10 ** -3)
+    b_om_f = (1-h_tax) * b_cap * p['fx_om_c'][:, b] * s['disc_om'][:, b] * (10 ** -3)
+    b_om_v = ((1-h_tax) * b_cap * p['vr_om_c'][:, b] *
+              b_disc_om * hours * (10 ** -6))
+    b_f    = ((1-h_tax) * b_cap * p['fl_c'][:, b] * p['heat_rate'][:, b] *
+              b_disc_fl * hours * (10 ** -9))
+    # Waste and decommissioning costs of the backup, as for a single
+    # source (nonzero only for a nuclear backup, see portfolio.py)
+    b_f    = b_f + (1-h_tax) * b_cap * p['waste_fee'][:, b] * b_disc * hours * (10 ** -3)
+    b_c    = b_c + (model.decom[b] * (1-h_tax) * s['disc_inf_end'][:, b] *
+                    p['on_c'][:, b] * 0.175)
+
+    # Hybrid transmission cost
+    h_t = ((p['trans_cost'][:, b] * b_cap_fac * b_cap + p['trans_cost'][:, h] * cap_fac * cap) /
+           (b_cf_mean * b_cap + cap_fac * cap))
+
+    # Social cost weights of the renewable and the backup source
+    r_sc_w = (cap * cap_fac) / (cap * cap_fac + b_cap * b_cf_mean)
+    b_sc_w = (b_cap * b_cf_mean) / (cap * cap_fac + b_cap * b_cf_mean)
+
+    h_op = b_op + c['s_op']
+    disc_inf = s['disc_inf'][:, h]
+    hyb = {}
+    hyb['Capital']      = (b_c + c['s_c']) / h_op / 10
+    hyb['Fixed O&M']    = (c['s_om_f'] + b_om_f) / h_op / 10
+    hyb['Variable O&M'] = (c['s_om_v'] + b_om_v) / h_op / 10
+    hyb['Fuel']         = b_f / h_op / 10
+    # Emissions weighted by the raw output of the renewable and the backup source
+    em = ((p['kgCO2 per MWh'][:, h] * c['s_op'] + p['kgCO2 per MWh'][:, b] * b_op) /
+          (c['s_op'] + b_op))
+    hyb['Carbon']       = em * s['disc_inf_scc'][:, h] / disc_inf * (10 ** -4)
+    hyb['Methane']      = (p['leak_rate'][:, b] * b_sc_w * (10 ** (-9)) * 0.969 * 19.3 *
+                           p['heat_rate'][:, b] * s['disc_inf_scm'][:, h] / disc_inf)
+    hyb['Transmission'] = h_t
+    hyb['Non-GHG External Costs'] = (r_sc_w * p['non_carbon_c'][:, h] +
+                                     b_sc_w * p['non_carbon_c'][:, b])
+    hyb['Effective SCC'] = s['disc_inf_scc'][:, h] / disc_inf
+    hyb['Effective SCM'] = s['disc_inf_scm'][:, h] / disc_inf
+    finish(hyb)
+
+    for col in lcoe_cols:
+        out[col] = np.array(np.broadcast_to(out[col], shape),
+                            dtype=np.result_type(out[col], hyb[col]))
+        out[col][:, h] = hyb[col]
+
+
+# Additional LCOE calculation
+def finish(out):
+    out['LCOE base'] = (out['Capital'] + out['Fixed O&M'] + out['Variable O&M'] +
+                        out['Fuel'] + out['Transmission'])
+    out['GHG External Costs'] = out['Carbon'] + out['Methane']
+    out['LCOE w/ Total Social Costs'] = (out['Carbon'] + out['Methane'] +
+                                         out['Non-GHG External Costs'] + out['LCOE base'])
+
+
+# LCOE results of every scenario as a data frame with the columns of
+# all_lcoe_results.csv plus a 'scenario' column (the row of 'scenarios').
+# 'inputs' is either the Inputs returned by load_inputs() or a Model
+# (see model.py), which saves the preparation when called repeatedly.
+def compute_lcoe_batch(inputs, scenarios=None, chunk_size=1024):
+    import pandas as pd
+    model = prepare(inputs)
+    results = evaluate(model, scenarios, chunk_size)
+    n, k = results['Capital'].shape
+    output = pd.DataFrame({'scenario': np.repeat(np.arange(n), k),
+                           'name': np.tile(model.names, n),
+                           'Online year': model.general_inputs['period_0_yr'] + 1})
+    for col in lcoe_cols:
+        output[col] = results[col].ravel()
+    return output
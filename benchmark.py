@@ -0,0 +1,302 @@
+# Purpose: Benchmark the loading and LCOE calculation stages on synthetic
+# workloads, and check the results against the bundled golden output.
+#
+# A workload is a synthetic csv_inputs-style directory built from the bundled
+# inputs: the single-source generations are cloned (with perturbed costs) up
+# to the requested number of sources, renewables get hybrid-source versions,
+# and the year schedules are stretched to the requested year span. Each stage
+# (csv parsing, escalation, backup extraction, single- and hybrid-source
+# calculation, results, csv output and the batch scenarios) is timed on its
+# own and the timings are written to a JSON file, so that runs can be
+# compared over time. The golden check recomputes csv_outputs/all_lcoe_results.csv
+# from csv_inputs and fails the run if any number changed.
+
+import argparse
+import datetime
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from load_inputs import (Inputs, load_general_inputs, load_rawdata, escalate, attach_backup,
+                         load_inputs, read_record, source, backup_source,
+                         default_input_dir, default_output_dir, here)
+from lcoe_calc import compute_lcoe, single_source_calc, hybrid_source_calc, lcoe_results
+from model import load_model, model_from_inputs
+from batch import compute_lcoe_batch, lcoe_cols
+from store import write_results
+
+
+################# GENERAL SETTINGS ##################
+
+# Bundled results the golden check compares against
+golden_file = os.path.join(default_output_dir, 'all_lcoe_results.csv')
+
+# Single-source generations cloned into synthetic inputs
+templates  = [name for name in source if name.find('hybrid') == -1 and name != backup_source]
+
+# Generations which can have a hybrid-source version
+renewables = ['hydro', 'solar', 'wind', 'offshore wind']
+
+# Cost inputs perturbed in the clones (so that clones are not identical)
+perturbed  = ['on_c', 'fx_om_c', 'vr_om_c', 'trans_cost']
+
+# Stages in the order they run
+stages = ['parse', 'escalate', 'backup', 'single', 'hybrid', 'results', 'output', 'batch']
+
+
+################# SYNTHETIC INPUTS ##################
+
+# Write a one-record csv file (the layout of every input file)
+def write_record(path, record):
+    pd.DataFrame([record]).to_csv(path, index=False)
+
+
+# Year schedule 'record' ({year: value}) over start_yr..end_yr. Years outside
+# the bundled schedule hold its first or last value.
+def stretch_schedule(record, start_yr, end_yr):
+    sched = {int(k): v for k, v in record.items()}
+    first, last = min(sched), max(sched)
+    return {yr: sched[min(max(yr, first), last)] for yr in range(start_yr, end_yr + 1)}
+
+
+# Names of 'n_sources' single-source generations: the templates first,
+# then numbered clones ('coal 2', 'coal with CCS 2', ...)
+def synthetic_names(n_sources):
+    return [name if i < len(templates) else '%s %d' % (name, i // len(templates) + 1)
+            for i, name in zip(range(n_sources), itertools.cycle(templates))]
+
+
+# Write a synthetic input directory to 'path' with 'n_sources' single-source
+# generations, 'n_hybrids' hybrid-source generations and the years
+# start_yr..end_yr (period_0_yr keeps its offset to start_yr). Returns the
+# list of generations to pass to load_inputs().
+def make_inputs(path, n_sources=len(templates), n_hybrids=len(renewables),
+                start_yr=2019, end_yr=2053, seed=0, template_dir=default_input_dir):
+    rng = np.random.default_rng(seed)
+    os.makedirs(path, exist_ok=True)
+
+    general = load_general_inputs(template_dir)
+    if end_yr - start_yr < general['period_0_yr'] - general['start_yr'] + 1:
+        raise ValueError('The year span %d..%d ends before the first year online'
+                         % (start_yr, end_yr))
+    general['period_0_yr'] = start_yr + general['period_0_yr'] - general['start_yr']
+    general['start_yr'], general['end_yr'] = start_yr, end_yr
+    write_record(os.path.join(path, 'general.csv'), general)
+
+    # Schedules shared by all generations
+    for name in ['METHANE_schedule.csv', 'CARBON_schedule.csv']:
+        record = read_record(os.path.join(template_dir, name))
+        write_record(os.path.join(path, name), stretch_schedule(record, start_yr, end_yr))
+    record = read_record(os.path.join(template_dir, 'DEFAULT_depreciation_schedule.csv'))
+    write_record(os.path.join(path, 'DEFAULT_depreciation_schedule.csv'), record)
+
+    # Write the files of generation 'name' cloned from 'template'
+    def clone(template, name, scale):
+        basic = read_record(os.path.join(template_dir, template + '.csv'))
+        for k in perturbed:
+            if k in basic:
+                basic[k] = basic[k] * scale
+        write_record(os.path.join(path, name + '.csv'), basic)
+        for suffix in ['_construction_schedule.csv', '_non_carbon_costs.csv']:
+            if os.path.exists(os.path.join(template_dir, template + suffix)):
+                record = read_record(os.path.join(template_dir, template + suffix))
+                write_record(os.path.join(path, name + suffix), record)
+        fuel_file = os.path.join(template_dir, template + '_fuel_price_schedule.csv')
+        if os.path.exists(fuel_file):
+            record = stretch_schedule(read_record(fuel_file), start_yr, end_yr)
+            write_record(os.path.join(path, name + '_fuel_price_schedule.csv'), record)
+        return basic
+
+    names = synthetic_names(n_sources)
+    caps  = {}
+    for template, name in zip(itertools.cycle(templates), names):
+        scale = 1.0 if name == template else rng.uniform(0.9, 1.1)
+        caps[name] = clone(template, name, scale)['cap']
+
+    # Hybrid-source versions of the renewables (in the order they were cloned)
+    candidates = [name for template, name in zip(itertools.cycle(templates), names)
+                  if template in renewables]
+    if n_hybrids > len(candidates):
+        raise ValueError('%d hybrid-source generations need at least %d renewables, '
+                         'but there are %d' % (n_hybrids, n_hybrids, len(candidates)))
+    hybrids = [name + '_hybrid' for name in candidates[:n_hybrids]]
+    aux = read_record(os.path.join(template_dir, 'solar_hybrid_aux.csv'))
+    for name in hybrids:
+        aux['equiv_cap'] = caps[name[:name.find('_')]]
+        write_record(os.path.join(path, name + '_aux.csv'), aux)
+
+    sources = names + hybrids
+    if hybrids:
+        clone(backup_source, backup_source, 1.0)
+        sources.append(backup_source)
+    return sources
+
+
+# Random scenarios around the general inputs of 'path': wacc, tax
+# and inflation, and the overnight cost of every generation
+def make_scenarios(model, n_scenarios, seed=0):
+    rng = np.random.default_rng(seed)
+    general = model.general_inputs
+    scenarios = {k: general[k] * rng.uniform(0.8, 1.2, n_scenarios)
+                 for k in ['wacc', 'tax', 'inf']}
+    for i, name in enumerate(model.sources):
+        scenarios[name + ':on_c'] = model.params['on_c'][i] * rng.uniform(0.8, 1.2, n_scenarios)
+    return pd.DataFrame(scenarios)
+
+
+##################### TIMING ######################
+
+# Run every stage once on the inputs in 'path' and return {stage: seconds}.
+# The csv output is written to 'output_dir'.
+def time_stages(path, sources, n_scenarios, output_dir):
+    times = {}
+    clock = time.perf_counter
+
+    t = clock()
+    general_inputs = load_general_inputs(path)
+    rawdata = load_rawdata(path, general_inputs, sources)
+    times['parse'] = clock() - t
+
+    t = clock()
+    rawdata_esc = escalate(rawdata, general_inputs, sources)
+    times['escalate'] = clock() - t
+
+    t = clock()
+    rawdata_esc = attach_backup(rawdata_esc, sources)
+    times['backup'] = clock() - t
+    inputs = Inputs(general_inputs, list(sources), rawdata_esc)
+
+    t = clock()
+    data, calc = single_source_calc(inputs.data.reset_index(drop=True), general_inputs,
+                                    sources, inputs.p0_yr, inputs.end_yr)
+    times['single'] = clock() - t
+
+    t = clock()
+    calc = hybrid_source_calc(data, calc, sources, inputs.p0_yr, inputs.end_yr)
+    times['hybrid'] = clock() - t
+
+    t = clock()
+    output = lcoe_results(calc, sources, inputs.p0_yr)
+    times['results'] = clock() - t
+
+    t = clock()
+    write_results(output, os.path.join(output_dir, 'all_lcoe_results.csv'))
+    times['output'] = clock() - t
+
+    if n_scenarios:
+        t = clock()
+        model = model_from_inputs(inputs)
+        compute_lcoe_batch(model, make_scenarios(model, n_scenarios))
+        times['batch'] = clock() - t
+    return times
+
+
+# Benchmark one workload: build its inputs, run the stages 'repeat' times
+# and summarize the timings of each stage (minimum, median and all runs)
+def run_workload(n_sources, n_hybrids, n_years, n_scenarios, repeat=3, start_yr=2019):
+    with tempfile.TemporaryDirectory() as tmp:
+        path    = os.path.join(tmp, 'inputs')
+        sources = make_inputs(path, n_sources, n_hybrids, start_yr, start_yr + n_years - 1)
+        runs    = [time_stages(path, sources, n_scenarios, tmp) for _ in range(repeat)]
+    timings = {}
+    for stage in stages:
+        values = [run[stage] for run in runs if stage in run]
+        if values:
+            timings[stage] = {'min': min(values), 'median': float(np.median(values)),
+                              'runs': values}
+    total = [sum(run[stage] for stage in stages[:-1]) for run in runs]
+    return {'workload': {'sources': n_sources, 'hybrids': n_hybrids, 'years': n_years,
+                         'scenarios': n_scenarios, 'repeat': repeat},
+            'rows': len(sources) * n_years,
+            'stages': timings,
+            'total': {'min': min(total), 'median': float(np.median(total))}}
+
+
+################## GOLDEN CHECK ###################
+
+# Largest relative difference of the numeric columns of two results frames
+def max_rel_diff(output, golden):
+    cols = [col for col in golden.columns if col != 'name']
+    a = output[cols].to_numpy(dtype=float)
+    b = golden[cols].to_numpy(dtype=float)
+    return float(np.max(np.abs(a - b) / np.maximum(np.abs(b), 1e-12)))
+
+
+# Recompute the bundled results from csv_inputs with compute_lcoe() and
+# the batch engine and compare them with csv_outputs/all_lcoe_results.csv.
+# Returns {engine: {'max_rel_diff': ..., 'passed': ...}}.
+def golden_check(rtol=1e-9, path=default_input_dir, golden=golden_file):
+    golden  = pd.read_csv(golden, index_col=0)
+    outputs = {'lcoe_calc': compute_lcoe(load_inputs(path)),
+               'batch': compute_lcoe_batch(load_model(path)).drop(columns='scenario')}
+    check = {}
+    for engine, output in outputs.items():
+        output = output.reset_index(drop=True)
+        if list(output['name']) != list(golden['name']):
+            check[engine] = {'max_rel_diff': None, 'passed': False,
+                             'error': 'generations differ from the golden results'}
+            continue
+        diff = max_rel_diff(output, golden[['name', 'Online year'] + lcoe_cols])
+        check[engine] = {'max_rel_diff': diff, 'passed': diff <= rtol}
+    return check
+
+
+# Machine and library versions, to tell apart runs on different setups
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=here, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'time': datetime.datetime.now().isoformat(timespec='seconds'),
+            'commit': commit,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+            'platform': platform.platform()}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the LCOE stages on synthetic inputs.')
+    parser.add_argument('--sources', type=int, nargs='+', default=[len(templates)],
+                        help='numbers of single-source generations (default: %(default)s)')
+    parser.add_argument('--hybrids', type=int, nargs='+', default=[len(renewables)],
+                        help='numbers of hybrid-source generations (default: %(default)s)')
+    parser.add_argument('--years', type=int, nargs='+', default=[35],
+                        help='year spans start_yr..end_yr (default: %(default)s)')
+    parser.add_argument('--scenarios', type=int, nargs='+', default=[1000],
+                        help='numbers of batch scenarios, 0 to skip (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='runs of each workload (default: %(default)s)')
+    parser.add_argument('--rtol', type=float, default=1e-9,
+                        help='relative tolerance of the golden check (default: %(default)s)')
+    parser.add_argument('-o', '--output', default='benchmark_results.json',
+                        help='JSON file of the results (default: %(default)s)')
+    args = parser.parse_args()
+
+    check = golden_check(args.rtol)
+    for engine, result in check.items():
+        print('golden check %-9s %s (max rel diff %s)' % (
+            engine, 'passed' if result['passed'] else 'FAILED', result['max_rel_diff']))
+
+    workloads = []
+    for n_sources, n_hybrids, n_years, n_scenarios in itertools.product(
+            args.sources, args.hybrids, args.years, args.scenarios):
+        result = run_workload(n_sources, n_hybrids, n_years, n_scenarios, args.repeat)
+        workloads.append(result)
+        print('sources %4d  hybrids %3d  years %4d  scenarios %7d  ' % (
+            n_sources, n_hybrids, n_years, n_scenarios) +
+            '  '.join('%s %.4fs' % (stage, t['min']) for stage, t in result['stages'].items()))
+
+    with open(args.output, 'w') as f:
+        json.dump({'environment': environment(), 'golden_check': check,
+                   'workloads': workloads}, f, indent=2)
+    print('results written to %s' % args.output)
+    sys.exit(0 if all(result['passed'] for result in check.values()) else 1)
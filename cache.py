@@ -0,0 +1,78 @@
+# Purpose: Cache of parsed inputs keyed on the content hashes of the input files.
+#
+# Each generation's parsed, year-aligned inputs are stored as one .npz file
+# in the cache directory, together with a key made of the hashes of the input
+# files it was built from. An entry is rebuilt only when that key changes, so
+# editing one generation's csv files rebuilds only that generation.
+
+import hashlib
+import os
+import re
+import numpy as np
+
+
+# Hash of the content of one file ('missing' if it does not exist,
+# so that adding an optional file also invalidates the entry)
+def file_hash(path):
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    except FileNotFoundError:
+        return 'missing'
+
+
+# Key of a cache entry built from the files 'files' of the directory 'path'.
+# 'salt' holds any other value the entry depends on (e.g. the year parameters).
+def content_key(path, files, salt=()):
+    h = hashlib.sha1()
+    for name in sorted(files):
+        h.update(name.encode())
+        h.update(file_hash(os.path.join(path, name)).encode())
+    h.update(repr(tuple(salt)).encode())
+    return h.hexdigest()
+
+
+# File of the cache entry of one generation
+def entry_path(cache_dir, name):
+    return os.path.join(cache_dir, re.sub(r'[^A-Za-z0-9]+', '_', name) + '.npz')
+
+
+# Read the data frame of one generation from the cache.
+# Returns None if there is no entry or its key differs.
+def read_entry(cache_dir, name, key):
+    import pandas as pd
+    try:
+        with np.load(entry_path(cache_dir, name), allow_pickle=False) as entry:
+            if str(entry['key']) != key:
+                return None
+            data = pd.DataFrame(entry['values'], columns=entry['columns'].tolist())
+            data.insert(0, 'year', entry['year'])
+    except (FileNotFoundError, KeyError, ValueError, OSError):
+        return None
+    data.insert(0, 'name', name)
+    return data
+
+
+# Write the data frame of one generation (columns 'name', 'year' and
+# numeric inputs) to the cache. The file is replaced atomically, so
+# concurrent readers never see a partial entry.
+def write_entry(cache_dir, name, key, data):
+    values = data.drop(columns=['name', 'year'])
+    os.makedirs(cache_dir, exist_ok=True)
+    path = entry_path(cache_dir, name)
+    tmp  = '%s.%d.tmp.npz' % (path[:-4], os.getpid())
+    np.savez(tmp, key=np.array(key),
+             columns=np.array(values.columns, dtype=str),
+             year=data['year'].to_numpy(dtype=int),
+             values=values.to_numpy(dtype=float))
+    os.replace(tmp, path)
+
+
+# Data frame of one generation, from the cache if its key is unchanged,
+# otherwise built by 'build()' and stored in the cache
+def cached_frame(cache_dir, name, key, build):
+    data = read_entry(cache_dir, name, key)
+    if data is None:
+        data = build()
+        write_entry(cache_dir, name, key, data)
+    return data
@@ -0,0 +1,104 @@
+# Purpose: Escalation and discount factors of all generations at once.
+#
+# Every factor is a geometric series in the years since start_yr, so the
+# curves of all generations (and all scenarios) are computed together as
+# arrays instead of looping over generations, factor types and years.
+# Rates are given in percent, as in general.csv and the generation inputs.
+
+import numpy as np
+
+
+# 'shift_yr' is the final year (e.g. 2040) of using
+# EIA fuel projections (and afterwards using inflation instead)
+shift_yr = 2040
+
+# 'fl_shift_fls' is a list of the fuels with the EIA projection shift (e.g. coal, gas)
+fl_shift_fls = ['coal', 'gas', 'nuclear']
+
+
+# Rates as float arrays. Complex arrays are kept complex, so that the
+# factors can carry the complex-step derivatives of sensitivity.py.
+def as_float(x):
+    x = np.asarray(x)
+    return x if np.iscomplexobj(x) else x.astype(float)
+
+
+# rate ** t for t = 0, 1, ..., n_years - 1 along a new last axis.
+# A running product is much cheaper than a power for every element.
+def powers(rate, n_years):
+    rate = as_float(rate)[..., None]
+    out  = np.empty(rate.shape[:-1] + (n_years,), dtype=rate.dtype)
+    out[..., :1] = 1
+    out[..., 1:] = rate
+    return np.cumprod(out, axis=-1)
+
+
+# Whether each generation's fuel follows the EIA projection shift.
+# core_gen_type is "coal" if the generation is "coal with CCS"
+def uses_fuel_shift(names):
+    return np.array([name.partition(' ')[0].lower() in fl_shift_fls
+                     for name in names], dtype=bool)
+
+
+# Fuel price relative to the start year price from a (source, year) fuel
+# price schedule: the EIA projection until shift_yr, then flat at the
+# shift_yr price. If the start year price is 0 the factors are 0.
+# 'years' are the years of the schedule, (year,) or (source, year) when
+# the generations cover different years (see vintage.py).
+def fuel_shift_factors(fuel_sched, years):
+    fuel  = np.asarray(fuel_sched, dtype=float)
+    base  = fuel[:, :1]
+    after = np.broadcast_to(np.asarray(years) > shift_yr, fuel.shape)
+    # Only schedules which reach past shift_yr but start before it are held
+    held  = after & (after.any(axis=-1) & ~after.all(axis=-1))[:, None]
+    last  = np.maximum(np.argmax(after, axis=-1) - 1, 0)[:, None]
+    fuel  = np.where(held, np.take_along_axis(fuel, last, axis=-1), fuel)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(base != 0, fuel / base, 0)
+
+
+# Inflation escalation factors, shape (..., year)
+def inflation_factors(inf, n_years):
+    # Inflation. the /100.0 are for percentage correction
+    return powers(1 + as_float(inf) / 100.0, n_years)
+
+
+# O&M escalation factors, shape (..., year).
+# Note that O&M and Fuel escalation rates account for inflation!
+def om_factors(inf, om_real, n_years):
+    return powers((1 + as_float(inf) / 100.0) *
+                  (1 + as_float(om_real) / 100.0), n_years)
+
+
+# Fuel escalation factors relative to inflation (fl = inf * fl_rel),
+# shape (..., source, year). Fuels in 'shift' use the EIA projection of
+# 'fuel_rel' (from fuel_shift_factors), the others escalate with fl_real.
+def fuel_factors_real(fl_real, shift, fuel_rel, n_years):
+    fl_rel = powers(1 + as_float(fl_real) / 100.0, n_years)
+    return np.where(np.asarray(shift)[:, None], fuel_rel, fl_rel)
+
+
+# Discount factors using WACC with baseline year equal to start year,
+# shape (..., source, year). 'wacc' may hold one WACC per generation.
+def discount_factors(wacc, n_years):
+    return powers(1 / (1 + as_float(wacc) / 100.0), n_years)
+
+
+# Escalation factors 'inf', 'om', 'fl' and discount factor 'disc' of
+# every generation over the years start_yr..end_yr.
+#   inf, om_real : general inputs, scalars or arrays of shape (...)
+#   fl_real, wacc: per generation, shape (..., source)
+#   fuel_sched   : (source, year) fuel price schedules
+#   shift        : (source,) bool, see uses_fuel_shift()
+# Returns (..., 1, year) arrays for 'inf' and 'om' and (..., source, year)
+# arrays for 'fl' and 'disc'.
+def escalation_factors(years, inf, om_real, fl_real, wacc, fuel_sched, shift):
+    n_years = len(years)
+    inf_f   = inflation_factors(as_float(inf)[..., None], n_years)
+    om_f    = om_factors(as_float(inf)[..., None],
+                         as_float(om_real)[..., None], n_years)
+    fl_rel  = fuel_factors_real(fl_real, shift, fuel_shift_factors(fuel_sched, years), n_years)
+    return {'inf':  inf_f,
+            'om':   om_f,
+            'fl':   inf_f * fl_rel,
+            'disc': discount_factors(wacc, n_years)}
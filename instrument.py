@@ -0,0 +1,187 @@
+# Purpose: Optional timing and memory instrumentation of the pipeline stages.
+#
+# The loading, calculation and output functions wrap their stages in
+#     with stage('escalate') as span:
+#         ...
+#         span.record(data)
+# When instrumentation is off (the default) stage() returns a shared no-op
+# span, so the cost is one function call per stage and nothing is recorded.
+# When it is on (enable() or the --trace option of the scripts) every stage
+# records its wall time, the peak RSS of the process at its end and the
+# rows/columns of the data frame it produced, optionally per generation.
+# The trace is written as JSON or in the Chrome trace format (load it in
+# chrome://tracing or https://ui.perfetto.dev).
+
+import json
+import os
+import threading
+import time
+
+try:
+    import resource
+except ImportError:     # not available on Windows
+    resource = None
+
+
+# Trace file formats
+trace_formats = ['json', 'chrome']
+
+# Active recorder, None when instrumentation is off
+recorder = None
+
+
+# Peak resident set size of this process in bytes (None if unknown)
+def peak_rss():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return rss if os.uname().sysname == 'Darwin' else rss * 1024
+
+
+# Span of a disabled stage: does nothing
+class NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def record(self, frame=None, rows=None, cols=None):
+        pass
+
+
+null_span = NullSpan()
+
+
+# One timed stage. The event is added to the recorder when the stage ends.
+class Span:
+    def __init__(self, recorder, name, source):
+        self.recorder = recorder
+        self.event    = {'name': name}
+        if source is not None:
+            self.event['source'] = source
+
+    def __enter__(self):
+        stack = self.recorder.stack()
+        self.event['depth'] = len(stack)
+        if stack:
+            self.event['parent'] = stack[-1].event['name']
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        end = time.perf_counter()
+        self.recorder.stack().pop()
+        self.event['start']    = self.start - self.recorder.t0
+        self.event['duration'] = end - self.start
+        self.event['peak_rss'] = peak_rss()
+        if exc_type is not None:
+            self.event['error'] = exc_type.__name__
+        self.recorder.add(self.event)
+        return False
+
+    # Record the size of the data produced by the stage: the shape of a
+    # data frame or array 'frame', or explicit 'rows' and 'cols'
+    def record(self, frame=None, rows=None, cols=None):
+        if frame is not None:
+            shape = getattr(frame, 'shape', (len(frame),))
+            rows  = shape[0]
+            cols  = shape[1] if len(shape) > 1 else None
+        if rows is not None:
+            self.event['rows'] = int(rows)
+        if cols is not None:
+            self.event['cols'] = int(cols)
+
+
+# Collects the events of all stages, in the order they end
+class Recorder:
+    def __init__(self):
+        self.t0     = time.perf_counter()
+        self.events = []
+        self.local  = threading.local()
+        self.lock   = threading.Lock()
+
+    # Stages open in the current thread
+    def stack(self):
+        if not hasattr(self.local, 'stack'):
+            self.local.stack = []
+        return self.local.stack
+
+    def add(self, event):
+        event['pid'] = os.getpid()
+        event['tid'] = threading.get_ident()
+        with self.lock:
+            self.events.append(event)
+
+    # Total time and number of calls of each stage (nested stages are
+    # counted in their parents too)
+    def summary(self):
+        totals = {}
+        for event in self.events:
+            total = totals.setdefault(event['name'], {'calls': 0, 'duration': 0.0})
+            total['calls']    += 1
+            total['duration'] += event['duration']
+        return totals
+
+    # Write the trace to 'path': a JSON document with the events and the
+    # summary ('json'), or the Chrome trace event format ('chrome')
+    def write(self, path, format='json'):
+        if format == 'json':
+            trace = {'events': self.events, 'summary': self.summary()}
+        elif format == 'chrome':
+            trace = {'traceEvents': [chrome_event(event) for event in self.events],
+                     'displayTimeUnit': 'ms'}
+        else:
+            raise ValueError('Unknown trace format: %r' % (format,))
+        with open(path, 'w') as f:
+            json.dump(trace, f, indent=1)
+
+
+# Complete ('X') event of the Chrome trace format, times in microseconds
+def chrome_event(event):
+    args = {k: v for k, v in event.items()
+            if k not in ('name', 'start', 'duration', 'pid', 'tid', 'depth', 'parent')}
+    name = event['name'] if 'source' not in event else '%s: %s' % (event['name'], event['source'])
+    return {'name': name, 'cat': event['name'], 'ph': 'X',
+            'ts': event['start'] * 1e6, 'dur': event['duration'] * 1e6,
+            'pid': event['pid'], 'tid': event['tid'], 'args': args}
+
+
+# Span of the stage 'name' (of the generation 'source', if given)
+def stage(name, source=None):
+    if recorder is None:
+        return null_span
+    return Span(recorder, name, source)
+
+
+# Turn instrumentation on and return the new recorder
+def enable():
+    global recorder
+    recorder = Recorder()
+    return recorder
+
+
+# Turn instrumentation off and return the recorder of the run
+def disable():
+    global recorder
+    done, recorder = recorder, None
+    return done
+
+
+# Context manager which records the stages run inside it and writes the
+# trace to 'path' (if given) at the end
+class tracing:
+    def __init__(self, path=None, format='json'):
+        self.path   = path
+        self.format = format
+
+    def __enter__(self):
+        return enable()
+
+    def __exit__(self, *exc):
+        done = disable()
+        if self.path is not None:
+            done.write(self.path, self.format)
+        return False
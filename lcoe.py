@@ -0,0 +1,78 @@
+# Purpose: Command-line entry point for short-lived LCOE runs.
+#
+# Meant to be called many times (e.g. by a scheduler): the results are
+# computed by the batch engine (batch.py) on the compact model, and
+# everything heavy is imported only when it is needed. With a snapshot of
+# the model (snapshot.py) a run needs NumPy only; pandas and the csv parsing
+# of load_inputs.py are loaded just to build the model from csv_inputs.
+#
+#   python lcoe.py --inputs csv_inputs --snapshot lcoe_inputs.npz   (builds the snapshot)
+#   python lcoe.py --snapshot lcoe_inputs.npz --sources nuclear solar
+#
+# The output has the columns of all_lcoe_results.csv.
+
+import argparse
+import csv
+import json
+import sys
+from batch import evaluate, lcoe_cols
+from model import load_model, select_sources
+from snapshot import load_snapshot
+
+
+# Rows of the results: name, Online year and the columns of lcoe_cols
+def result_rows(model, results):
+    online = int(model.general_inputs['period_0_yr']) + 1
+    return [dict({'name': name, 'Online year': online},
+                 **{col: float(results[col][0, j]) for col in lcoe_cols})
+            for j, name in enumerate(model.names)]
+
+
+# Write the rows as all_lcoe_results.csv (with its index column) or as JSON
+def write_rows(rows, f, format='csv'):
+    if format == 'json':
+        json.dump(rows, f, indent=1)
+        f.write('\n')
+        return
+    writer = csv.writer(f, lineterminator='\n')
+    writer.writerow([''] + list(rows[0]) if rows else [])
+    for i, row in enumerate(rows):
+        writer.writerow([i] + [repr(v) if isinstance(v, float) else v for v in row.values()])
+
+
+# LCOE results of the generations 'sources' (default: all) of the model
+# in the snapshot 'snapshot' and/or the input directory 'inputs'
+def run(inputs=None, snapshot=None, sources=None):
+    if snapshot:
+        model = load_snapshot(snapshot, inputs)
+    else:
+        model = load_model(inputs)
+    if sources:
+        model = select_sources(model, sources)
+    return result_rows(model, evaluate(model))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Calculate the LCOE of the generations.')
+    parser.add_argument('--inputs', default=None,
+                        help='input directory (default: csv_inputs, or none with --snapshot)')
+    parser.add_argument('--snapshot', default=None,
+                        help='read the model from this snapshot; with --inputs it is '
+                             'rebuilt when missing or older than the inputs')
+    parser.add_argument('--sources', nargs='+', default=None,
+                        help='compute only these generations')
+    parser.add_argument('--format', choices=['csv', 'json'], default='csv',
+                        help='output format (default: %(default)s)')
+    parser.add_argument('-o', '--output', default='-',
+                        help='output file (default: standard output)')
+    args = parser.parse_args()
+
+    try:
+        rows = run(args.inputs, args.snapshot, args.sources)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.output == '-':
+        write_rows(rows, sys.stdout, args.format)
+    else:
+        with open(args.output, 'w', newline='') as f:
+            write_rows(rows, f, args.format)
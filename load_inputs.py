@@ -1,297 +1,391 @@
-# Purpose: Load inputs for the LCOE calculations. 
+# Purpose: Load inputs for the LCOE calculations.
 # Author: Wanru(Anora) Wu
 # Reference: Henry Zhang
 
+import numpy as np
 import pandas as pd
 import os
 import csv
+from dataclasses import dataclass
+from escalation import escalation_factors, uses_fuel_shift
+from cache import cached_frame, content_key
+from instrument import stage
 
 
 ################# GENERAL SETTINGS ##################
-# Change to your own directory of inputs
-os.chdir(r'C:\Users\Anora\OneDrive\Desktop\LCOE\anora_rewrite\csv_inputs')
-
-# List of generations. 
-source = ['coal', 'coal with CCS', 'gas', 'gas with CCS', 
-          'hydro', 'nuclear', 'solar', 'wind', 'offshore wind', 
-          'hydro_hybrid', 
-          'solar_hybrid', 
-          'wind_hybrid',    
-          'offshore wind_hybrid', 
+
+# Default directories of inputs and outputs (next to this file)
+here = os.path.dirname(os.path.abspath(__file__))
+default_input_dir  = os.path.join(here, 'csv_inputs')
+default_output_dir = os.path.join(here, 'csv_outputs')
+
+# List of generations.
+source = ['coal', 'coal with CCS', 'gas', 'gas with CCS',
+          'hydro', 'nuclear', 'solar', 'wind', 'offshore wind',
+          'hydro_hybrid',
+          'solar_hybrid',
+          'wind_hybrid',
+          'offshore wind_hybrid',
           'gas (advanced ct)']
 
+# Name of the backup source of hybrid-source generations
+backup_source = 'gas (advanced ct)'
+
+# Scalar inputs of the generations. Inputs that none of the loaded
+# generations have (e.g. 'leak_rate' without gas) are set to 0
+input_columns = ['cap', 'cap_fac', 'fx_om_c', 'heat_rate', 'kgCO2 per MWh',
+                 'on_c', 'trans_cost', 'vr_om_c', 'waste_fee', 'non_carbon_c',
+                 'leak_rate', 'fl_c', 'fl_real', 'equiv_cap', 'equiv_cap_fac',
+                 'cap_fac_max', 'hybrid_tax', 'hybrid_wacc']
+
+# Input files shared by all single-source generations
+shared_files = ['DEFAULT_depreciation_schedule.csv',
+                'METHANE_schedule.csv',
+                'CARBON_schedule.csv']
+
+
+# Everything the LCOE calculation needs: the general inputs, the list of
+# generations and the escalated data frame (one row per generation and year)
+@dataclass
+class Inputs:
+    general_inputs: dict
+    sources: list
+    data: pd.DataFrame
+
+    @property
+    def p0_yr(self):
+        return self.general_inputs['period_0_yr']
+
+    @property
+    def start_yr(self):
+        return self.general_inputs['start_yr']
+
+    @property
+    def end_yr(self):
+        return self.general_inputs['end_yr']
+
+
 # Temporary helper function to convert dictionaries' keys into intergers
 def convert_keys_to_int(dic: dict):
     new_dic = {int(k): v for k, v in dic.items()}
     return new_dic
 
 
+# Helper function which reads the first record of a csv file as a dictionary
+def read_record(path):
+    return pd.read_csv(path).to_dict('records')[0]
+
+
 ################### LOAD INPUTS ###################
 
-# 'general inputs' is a dictionary containing 
-general_inputs = pd.read_csv('general.csv').to_dict('records')[0]
-
-# Get the year parameter
-p0_yr    = general_inputs['period_0_yr'] 
-start_yr = general_inputs['start_yr'] 
-end_yr   = general_inputs['end_yr'] 
-
-# The data frame used to store single-source generations' inputs
-single_data = pd.DataFrame()
-
-# Load input for single-source generations
-# Note that we load inputs of the backup source as other single 
-# Source generations and extract its information later
-for source_name in source: 
-    if source_name.find('hybrid') == -1: # single source
-
-        # Dictionaries for construction and depreciation schedule 
-        constr = pd.read_csv(source_name + '_construction_schedule.csv').to_dict('records')[0]
-        constr = convert_keys_to_int(constr)
-        depr   = pd.read_csv('DEFAULT_depreciation_schedule.csv').to_dict('records')[0]
-        depr   = convert_keys_to_int(depr)
-
-        # Fix the format of construction & depreciation schedules so that the keys
-        # are years, not periods. The /100.0 is for percentage correction
-        constr_sched  = {}      # corrected construction schedule as fraction/decimal
-        depr_sched    = {}      # corrected depreciation schedule as fraction/decimal
-        for yr in range(start_yr, end_yr + 1):
-            try:
-                constr_sched[yr] = constr[yr - p0_yr] / 100.0
-            except KeyError:
-                constr_sched[yr] = 0
-            try:
-                depr_sched[yr]   = depr[yr - p0_yr] / 100.0
-            except KeyError:
-                depr_sched[yr]   = 0
-        
-        # Fuel price schdule
+# Names of the input files a generation is built from. Hybrid-source
+# generations also depend on the files of their renewable source.
+def source_files(source_name):
+    if source_name.find('hybrid') != -1:
+        renewable = source_name[:source_name.find('_')]
+        return source_files(renewable) + [source_name + '_aux.csv']
+    return [source_name + suffix for suffix in
+            ['.csv', '_construction_schedule.csv',
+             '_fuel_price_schedule.csv', '_non_carbon_costs.csv']] + shared_files
+
+
+# 'general inputs' is a dictionary containing the year parameters
+# and the economic assumptions (wacc, tax, inflation, ...)
+def load_general_inputs(path):
+    return read_record(os.path.join(path, 'general.csv'))
+
+
+# Schedules shared by all single-source generations (depreciation,
+# methane and carbon), loaded once as dictionaries keyed by period or year
+def load_shared_schedules(path):
+    depr_file, meth_file, carb_file = shared_files
+    return {'depr': convert_keys_to_int(read_record(os.path.join(path, depr_file))),
+            'meth': convert_keys_to_int(read_record(os.path.join(path, meth_file))),
+            'carb': convert_keys_to_int(read_record(os.path.join(path, carb_file)))}
+
+
+# Load the inputs of one single-source generation into a data frame
+# with one row per year. 'shared' are the schedules returned by
+# load_shared_schedules() (loaded here if not given).
+def load_single_source(path, source_name, general_inputs, shared=None):
+    # Get the year parameter
+    p0_yr    = general_inputs['period_0_yr']
+    start_yr = general_inputs['start_yr']
+    end_yr   = general_inputs['end_yr']
+    if shared is None:
+        shared = load_shared_schedules(path)
+
+    # Dictionaries for construction and depreciation schedule
+    constr = read_record(os.path.join(path, source_name + '_construction_schedule.csv'))
+    constr = convert_keys_to_int(constr)
+    depr   = shared['depr']
+
+    # Fix the format of construction & depreciation schedules so that the keys
+    # are years, not periods. The /100.0 is for percentage correction
+    constr_sched  = {}      # corrected construction schedule as fraction/decimal
+    depr_sched    = {}      # corrected depreciation schedule as fraction/decimal
+    for yr in range(start_yr, end_yr + 1):
         try:
-            fuel_sched = list(csv.DictReader(open(source_name + '_fuel_price_schedule.csv')))[0]
-            fuel_sched = convert_keys_to_int(fuel_sched)
-        except IOError:
-            fuel_sched = None
-
-
-        # Methane schedule and carbon schedule
-        meth_sched = pd.read_csv('METHANE_schedule.csv').to_dict('records')[0]
-        meth_sched = convert_keys_to_int(meth_sched)
-        carb_sched = pd.read_csv('CARBON_schedule.csv').to_dict('records')[0]
-        carb_sched = convert_keys_to_int(carb_sched)
-        
-        # Merge all inputs into one dataframe
-        data = pd.DataFrame({'constr_sched':pd.Series(constr_sched),
-                             'depr_sched':pd.Series(depr_sched),
-                             'fuel_sched':pd.Series(fuel_sched),
-                             'meth_sched':pd.Series(meth_sched),
-                             'carb_sched':pd.Series(carb_sched)})
-        
-        # Extract year column from index
-        data.reset_index(inplace=True)
-        data = data.rename(columns = {'index': 'year'})
-        data.astype({'year': 'int'}) # change years to int  
-        
-        # Load other basic inputs into the data frame
-        # First convert basic inputs into dictionary 
-        # Use disctionaty keys as columns names and 
-        # dictionary values as column values
-        basic_input = pd.read_csv(source_name + '.csv').to_dict('records')[0]
-        for k,v in basic_input.items():
-            data[str(k)] = v # add dictionary's information to the data frame
-        
-        # Non-carbon-cost
+            constr_sched[yr] = constr[yr - p0_yr] / 100.0
+        except KeyError:
+            constr_sched[yr] = 0
         try:
-            non_carbon_c = pd.read_csv(source_name + '_non_carbon_costs.csv').to_dict('records')[0]
-        except: # otherwise use default
-            non_carbon_c = {'mean': 0}
-        data['non_carbon_c'] = non_carbon_c['mean']
-
-        # Insert the column of source name
-        data.insert(0, 'name', source_name) 
-        
-        # Add data to the data frame that contains 
-        # Information for all single-source generations
-        single_data = pd.concat([single_data,data])
-
-# dataframe that contain inputs of hybrid-source generations
-hybrid_data = pd.DataFrame() 
-# dataframe that contain inputs of all generations (single and hybrid ones)
-rawdata = pd.DataFrame() 
-
-# Load inputs of hybrid-source generations, including renewable sources,
-# auxiliary information. Inputs of renewables are replicated from 
-# single-source generations. Backup source inputs are loaded with
-# single-source generation and will be extracted later. 
-for source_name in source:
-    if source_name.find('hybrid') != -1: # Load input of renewable sources
-        # Extract name of renewable source
-        renewable = source_name[:source_name.find('_')] 
-        # Replicate information from single source generations
-        hybrid_data = single_data.loc[single_data['name'] == renewable] 
-        # Add generation name 
-        hybrid_data['name'] = source_name
-
-        # Auxiliary information
-        # First convert Auxiliary inputs into dictionary 
-        # Use disctionaty keys as columns names and dictionary values as column values
-        aux_input = pd.read_csv(source_name + '_aux.csv').to_dict('records')[0]
-        for k,v in aux_input.items():
-            # add dictionary's information to the data frame
-            hybrid_data[str(k)] = v 
-
-        # Concat all inputs into the data frame of all 
-        # generations (single and hybrid ones)
-        rawdata = pd.concat([rawdata,hybrid_data])
-
-# Concat inputs of single sources into the big data frame
-rawdata = pd.concat([single_data,rawdata])
-rawdata.fillna(0,inplace=True)
-
-# Clean data
-# Columns whose values need to convert into floats
-cols = [col for col in rawdata.columns if col not in ['name', 'year']]
-# Convert columns to float
-for col in cols:
-    rawdata[col] = rawdata[col].astype(float)
+            depr_sched[yr]   = depr[yr - p0_yr] / 100.0
+        except KeyError:
+            depr_sched[yr]   = 0
+
+    # Fuel price schdule
+    try:
+        with open(os.path.join(path, source_name + '_fuel_price_schedule.csv')) as f:
+            fuel_sched = list(csv.DictReader(f))[0]
+        fuel_sched = {k: float(v) for k, v in convert_keys_to_int(fuel_sched).items()}
+    except IOError:
+        fuel_sched = None
+
+    # Methane schedule and carbon schedule
+    meth_sched = shared['meth']
+    carb_sched = shared['carb']
+
+    # Merge all inputs into one dataframe
+    data = pd.DataFrame({'constr_sched':pd.Series(constr_sched),
+                         'depr_sched':pd.Series(depr_sched),
+                         'fuel_sched':pd.Series(fuel_sched),
+                         'meth_sched':pd.Series(meth_sched),
+                         'carb_sched':pd.Series(carb_sched)})
+
+    # Keep the years of the calculation only: the schedules given by calendar
+    # year (fuel price, methane and carbon) may cover years before start_yr or
+    # after end_yr, which would be summed into the end year terms of lcoe_calc.py
+    data = data.loc[start_yr:end_yr]
 
+    # Extract year column from index
+    data.reset_index(inplace=True)
+    data = data.rename(columns = {'index': 'year'})
+    data = data.astype({'year': 'int'}) # change years to int
+
+    # Load other basic inputs into the data frame
+    # First convert basic inputs into dictionary
+    # Use disctionaty keys as columns names and
+    # dictionary values as column values
+    basic_input = read_record(os.path.join(path, source_name + '.csv'))
+    for k,v in basic_input.items():
+        data[str(k)] = v # add dictionary's information to the data frame
+
+    # Non-carbon-cost
+    try:
+        non_carbon_c = read_record(os.path.join(path, source_name + '_non_carbon_costs.csv'))
+    except IOError: # otherwise use default
+        non_carbon_c = {'mean': 0}
+    data['non_carbon_c'] = non_carbon_c['mean']
+
+    # Insert the column of source name
+    data.insert(0, 'name', source_name)
+    return data
+
+
+# Load inputs of a hybrid-source generation, including renewable sources,
+# auxiliary information. Inputs of renewables are replicated from
+# single-source generations. Backup source inputs are loaded with
+# single-source generation and will be extracted later.
+def load_hybrid_source(path, source_name, single_data):
+    # Extract name of renewable source
+    renewable = source_name[:source_name.find('_')]
+    # Replicate information from single source generations
+    hybrid_data = single_data.loc[single_data['name'] == renewable].copy()
+    # Add generation name
+    hybrid_data['name'] = source_name
+
+    # Auxiliary information
+    # First convert Auxiliary inputs into dictionary
+    # Use disctionaty keys as columns names and dictionary values as column values
+    aux_input = read_record(os.path.join(path, source_name + '_aux.csv'))
+    for k,v in aux_input.items():
+        # add dictionary's information to the data frame
+        hybrid_data[str(k)] = v
+    return hybrid_data
+
+
+# Load the inputs of all generations (single and hybrid ones)
+# into one data frame. If 'cache_dir' is given, the parsed inputs of
+# each generation are cached there and only rebuilt when its input
+# files (see source_files()) change.
+def load_rawdata(path, general_inputs, sources=source, cache_dir=None):
+    # The shared schedules are only parsed if some generation is rebuilt
+    shared = {}
+    def get_shared():
+        if not shared:
+            shared.update(load_shared_schedules(path))
+        return shared
+
+    # Schedules are aligned to the year parameters, so they are part of the key
+    years = (general_inputs['period_0_yr'], general_inputs['start_yr'],
+             general_inputs['end_yr'])
+    def load(source_name, build):
+        with stage('parse', source_name) as span:
+            if cache_dir is None:
+                data = build()
+            else:
+                key  = content_key(path, source_files(source_name), salt=years)
+                data = cached_frame(cache_dir, source_name, key, build)
+            span.record(data)
+        return data
+
+    # Load input for single-source generations
+    # Note that we load inputs of the backup source as other single
+    # Source generations and extract its information later
+    single_data = []
+    for source_name in sources:
+        if source_name.find('hybrid') == -1:
+            single_data.append(load(source_name, lambda: load_single_source(
+                path, source_name, general_inputs, get_shared())))
+    single_data = pd.concat(single_data)
+
+    # Load inputs of hybrid-source generations
+    hybrid_data = []
+    for source_name in sources:
+        if source_name.find('hybrid') != -1:
+            hybrid_data.append(load(source_name, lambda: load_hybrid_source(
+                path, source_name, single_data)))
+
+    # Concat inputs of single sources into the big data frame
+    with stage('clean') as span:
+        rawdata = pd.concat([single_data] + hybrid_data)
+        for col in input_columns:
+            if col not in rawdata:
+                rawdata[col] = 0
+        rawdata.fillna(0,inplace=True)
+
+        # Clean data
+        # Columns whose values need to convert into floats
+        cols = [col for col in rawdata.columns if col not in ['name', 'year']]
+        # Convert columns to float
+        for col in cols:
+            rawdata[col] = rawdata[col].astype(float)
+        span.record(rawdata)
+    return rawdata
 
 
 ############ ESCALATION FACTORS CALCULATION ############
 
-# 'fl_shift_yr' is the final year (e.g. 2040) of using 
-# EIA fuel projections (and afterwards using inflation instead)
-shift_yr = 2040
-
-# 'fl_shift_fls' is a list of the fuels with the EIA projection shift (e.g. coal, gas)
-fl_shift_fls = ['coal', 'gas', 'nuclear']
-
-# Data frame that contains escalation factors and inputs of all generations
-rawdata_esc = pd.DataFrame()
-
-# Calculating escalation factors
-for source_name in source:
-    # Extract core generation type 
-    # core_gen_type is "coal" if the input generation type is "Coal with CCS"
-    # Note that we also calculated backup source's escalation factor here
-    core_gen_type = source_name.partition(' ')[0].lower()
-    # A condition that used later to specify the data used in the data frame
-    condition = (rawdata['name'] == source_name)
-
-    esc = {} # dictionary that contains escalation factors
-    rates = {} # dictionary that contains rates used to calculate escalation factors
-    # Inflation. the /100.0 are for percentage correction
-    rates['inf'] = 1 + (float(general_inputs['inf'])/100.0)
-
-    # Note that O&M and Fuel escalation rates account for inflation!
-    rates['om'] = ((1 + (float(general_inputs['inf'])/100.0)) * 
-                   (1 + (float(general_inputs['om_real'])/100.0)))
-    
-    # Extract the value of fl_real 
-    # Since fl_real is the same across all years, 
-    # so I just picked start_yr randomly.
-    fl_real = list(rawdata.loc[(condition) & (
-                   rawdata['year'] == start_yr), 'fl_real'])[0]
-    if (rawdata.loc[condition, 'fuel_sched'] == 0).all():
-        rates['fl'] = (1 + (float(general_inputs['inf']/100.0))) * \
-            (1 + (fl_real)/100.0)
-
-    # Iterate over three types of escalation factors
-    for f in ['inf', 'om', 'fl']:
-        esc[f] = {}
-        if f == 'fl' and (core_gen_type in fl_shift_fls):
-            # Use EIA projection for fuel escalation until fl_shift_yr=2040,
-            # Then use inflation factor beyond that
-            base_price = list(rawdata.loc[condition & (
-                rawdata['year'] == start_yr), 'fuel_sched'])[0]
-            shift_price = list(rawdata.loc[condition & (
-                rawdata['year'] == shift_yr), 'fuel_sched'])[0]
-            rawdata.loc[condition, 'fl_c'] = base_price
-            for yr in range(start_yr, shift_yr + 1):
-                if base_price != 0:
-                    esc[f][yr] = (list(rawdata.loc[(condition) & (rawdata['year'] == yr), 'fuel_sched'])[0] *
-                                  (rates['inf'] ** (yr - start_yr)) / base_price)
-                else:  # if initial price is 0, escalation values are infinite
-                    esc[f][yr] = 0
-            for yr in range(shift_yr + 1, end_yr + 1):
-                if base_price != 0:
-                    esc[f][yr] = (shift_price / base_price) * \
-                        (rates['inf'] ** (yr - start_yr))
-                else:  # if initial price is 0, escalation values are infinite
-                    esc[f][yr] = 0
-        else:
-            # Simple exponential annual growth in escalation factor
-            for yr in range(start_yr, end_yr + 1):
-                esc[f][yr] = rates[f] ** (yr - start_yr)
-
-    # Discount factor using WACC, with baseline year equal to start year
-    if source_name.find('hybrid') == -1:
-        wacc = float(general_inputs['wacc']) / 100.0    # percentage correction
-    else:
-        wacc = list(rawdata.loc[(rawdata['name'] == source_name) & (
-            rawdata['year'] == p0_yr), 'hybrid_wacc'])[0] / 100
-    esc['disc'] = {}
-    for period in range(0, end_yr - start_yr + 1):    # +1 is to include end year
-        esc['disc'][period + start_yr] = 1/(1 + wacc)**(period + 0)
-
-    # Merge dict into dataframe
-    escalation_data = pd.DataFrame.from_dict(esc)
-    # Extract year column from index
-    escalation_data.reset_index(inplace=True)
-    escalation_data.rename(columns={'index': 'year'}, inplace=True)
-    # Add generation name
-    escalation_data.insert(0, 'name', source_name)
-
-    # Data frame containing all inputs of one generation
-    filtered_rawdata = rawdata[rawdata['name'] == source_name]
-    # Merge with escalation_data
-    filtered_rawdata = filtered_rawdata.merge(
-                       escalation_data, on=['name', 'year'], how='outer')
-    # Merge with the rawdata_esc data frame
-    rawdata_esc = pd.concat([rawdata_esc, filtered_rawdata], ignore_index=True)
+# Calculate the escalation factors of all generations and merge
+# them into the inputs. Returns a new data frame.
+def escalate(rawdata, general_inputs, sources=source):
+    start_yr = general_inputs['start_yr']
+    end_yr   = general_inputs['end_yr']
+    p0_yr    = general_inputs['period_0_yr']
+    years    = np.arange(start_yr, end_yr + 1)
+    rawdata  = rawdata.copy()
+
+    # Inputs of each generation as arrays in the order of 'sources'.
+    # fl_real and hybrid_wacc are the same across all years, so the
+    # values of one year are used
+    fuel_sched = (rawdata.pivot(index='name', columns='year', values='fuel_sched')
+                  .reindex(index=sources, columns=years).fillna(0).to_numpy())
+    scalars    = rawdata.loc[rawdata['year'] == p0_yr].set_index('name').reindex(sources)
+    fl_real    = scalars['fl_real'].to_numpy(dtype=float)
+
+    # Discount factor using WACC (hybrid_wacc for hybrid-source generations)
+    is_hybrid = np.array([name.find('hybrid') != -1 for name in sources])
+    wacc = float(general_inputs['wacc'])
+    if 'hybrid_wacc' in scalars:
+        wacc = np.where(is_hybrid, scalars['hybrid_wacc'].to_numpy(dtype=float), wacc)
+
+    # Note that we also calculate the backup source's escalation factors here
+    shift = uses_fuel_shift(sources)
+    esc = escalation_factors(years, general_inputs['inf'], general_inputs['om_real'],
+                             fl_real, np.broadcast_to(wacc, len(sources)),
+                             fuel_sched, shift)
+
+    # Fuels with the EIA projection use the start year price as fuel cost
+    base_price = pd.Series(fuel_sched[:, 0], index=sources)
+    shifted    = rawdata['name'].isin(np.array(sources)[shift])
+    rawdata.loc[shifted, 'fl_c'] = rawdata.loc[shifted, 'name'].map(base_price)
+
+    # Data frame of the escalation factors, one row per generation and year
+    escalation_data = pd.DataFrame({
+        'name': np.repeat(sources, len(years)),
+        'year': np.tile(years, len(sources))})
+    for f in ['inf', 'om', 'fl', 'disc']:
+        escalation_data[f] = np.broadcast_to(esc[f], (len(sources), len(years))).ravel()
+
+    # Merge with the inputs of all generations
+    return rawdata.merge(escalation_data, on=['name', 'year'], how='outer')
 
 
 ############ EXTRACT BACKUP SOURCE INPUTS ############
 
-# For each generation, we aim to append a backup source input as 
-# columns in the dataframe. For single-source generations those 
+# For each generation, we aim to append a backup source input as
+# columns in the dataframe. For single-source generations those
 # columns are filled with '0's.
-
-# Extract backup source data
-backup_data = rawdata_esc.loc[rawdata_esc['name']=='gas (advanced ct)']
-
-# Drop repetitive columns
-backup_data.drop(['equiv_cap','equiv_cap_fac','cap_fac_max',
-                  'hybrid_tax','hybrid_wacc','name','inf',
-                  'om'],axis=1,inplace=True)
-
-# Add prefix to each column and change column name
-backup_data = backup_data.add_prefix('backup_')
-backup_data.rename(columns={'backup_year': 'year'},inplace=True)
-
-# Append the backup source data back 
-rawdata_esc = rawdata_esc.loc[rawdata_esc['name']!='gas (advanced ct)']
-rawdata_esc = rawdata_esc.merge(backup_data,on='year',how='outer')
-
-# For single-source generations, set the columns for backup source to be '0'.
-single_sources = [i for i in source if i.find('hybrid') == -1]
-for col in rawdata_esc.columns:
-    if col.startswith('backup'):
-        rawdata_esc.loc[rawdata_esc['name'].isin(single_sources), col] = 0
-
-# compute the mean backup capacity factor for hybrid sources
-# pct to decimal
-rawdata_esc['backup_cf_mean'] = ((rawdata_esc['equiv_cap'] * (rawdata_esc['equiv_cap_fac'] 
-                                / 100.0) - rawdata_esc['cap'] * (rawdata_esc['cap_fac'] / 100.0)) 
-                                / rawdata_esc['backup_cap'])
-rawdata_esc.loc[rawdata_esc['backup_cf_mean'] == float('-inf'), 'backup_cf_mean'] = 0
-
+def attach_backup(rawdata_esc, sources=source):
+    # Extract backup source data
+    backup_data = rawdata_esc.loc[rawdata_esc['name']==backup_source]
+
+    # Drop repetitive columns
+    backup_data = backup_data.drop(['equiv_cap','equiv_cap_fac','cap_fac_max',
+                                    'hybrid_tax','hybrid_wacc','name','inf',
+                                    'om'],axis=1)
+
+    # Add prefix to each column and change column name
+    backup_data = backup_data.add_prefix('backup_')
+    backup_data.rename(columns={'backup_year': 'year'},inplace=True)
+
+    # Append the backup source data back
+    rawdata_esc = rawdata_esc.loc[rawdata_esc['name']!=backup_source]
+    rawdata_esc = rawdata_esc.merge(backup_data,on='year',how='outer')
+
+    # For single-source generations, set the columns for backup source to be '0'.
+    single_sources = [i for i in sources if i.find('hybrid') == -1]
+    for col in rawdata_esc.columns:
+        if col.startswith('backup'):
+            rawdata_esc.loc[rawdata_esc['name'].isin(single_sources), col] = 0
+
+    # compute the mean backup capacity factor for hybrid sources
+    # pct to decimal
+    rawdata_esc['backup_cf_mean'] = ((rawdata_esc['equiv_cap'] * (rawdata_esc['equiv_cap_fac']
+                                    / 100.0) - rawdata_esc['cap'] * (rawdata_esc['cap_fac'] / 100.0))
+                                    / rawdata_esc['backup_cap'])
+    rawdata_esc.loc[rawdata_esc['backup_cf_mean'] == float('-inf'), 'backup_cf_mean'] = 0
+
+    return rawdata_esc.sort_values(['name','year'])
+
+
+# Load, clean and escalate all inputs found in the directory 'path'.
+# The working directory is left untouched and nothing is written to disk
+# unless 'cache_dir' is given (see load_rawdata()), so the returned Inputs
+# can be reused for any number of calculations.
+def load_inputs(path=default_input_dir, sources=source, cache_dir=None):
+    with stage('load_rawdata') as span:
+        general_inputs = load_general_inputs(path)
+        rawdata        = load_rawdata(path, general_inputs, sources, cache_dir)
+        span.record(rawdata)
+    with stage('escalate') as span:
+        rawdata_esc    = escalate(rawdata, general_inputs, sources)
+        span.record(rawdata_esc)
+    with stage('attach_backup') as span:
+        rawdata_esc    = attach_backup(rawdata_esc, sources)
+        span.record(rawdata_esc)
+    return Inputs(general_inputs, list(sources), rawdata_esc)
 
 
 ############ OUTPUT THE DATA FRAME TO CSV ############
-rawdata_esc = rawdata_esc.sort_values(['name','year'])
-
-# change to your own directory of outputs
-os.chdir(r'C:\Users\Anora\OneDrive\Desktop\LCOE\anora_rewrite\csv_outputs')
-rawdata_esc.to_csv('rawdata_esc.csv')
-
 
+if __name__ == '__main__':
+    import argparse
+    from store import formats, write_inputs
+    from contextlib import nullcontext
+    from instrument import trace_formats, tracing
+
+    parser = argparse.ArgumentParser(description='Load and escalate the inputs of all generations.')
+    parser.add_argument('--format', choices=formats, default='csv',
+                        help='csv file or Parquet dataset (default: %(default)s)')
+    parser.add_argument('--trace', default=None,
+                        help='record the time and memory of every stage into this file')
+    parser.add_argument('--trace-format', choices=trace_formats, default='json',
+                        help='JSON events or Chrome trace format (default: %(default)s)')
+    args = parser.parse_args()
+
+    with tracing(args.trace, args.trace_format) if args.trace else nullcontext():
+        inputs = load_inputs(default_input_dir)
+        name   = 'rawdata_esc' + ('.csv' if args.format == 'csv' else '')
+        write_inputs(inputs, os.path.join(default_output_dir, name), args.format)
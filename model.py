@@ -0,0 +1,232 @@
+# Purpose: Compact model of the LCOE inputs.
+#
+# Instead of one long data frame with a row per generation and year (with the
+# scalar inputs repeated in every row and the backup source copied into
+# zero-filled 'backup_' columns), the model keeps
+#   - the scalar inputs of each generation as (source,) arrays,
+#   - the year-indexed schedules as float arrays, each distinct schedule
+#     stored once (one carbon schedule for all generations, a hybrid shares
+#     the construction schedule of its renewable, ...),
+#   - the backup source of each hybrid-source generation as an index into
+#     the generations,
+#   - optionally yearly capacity factors reduced from hourly generation
+#     profiles (see profiles.py).
+# The batch engine (batch.py) runs the LCOE formulas on it directly.
+
+import dataclasses
+import numpy as np
+from dataclasses import dataclass
+from functools import cached_property
+from escalation import fuel_shift_factors, uses_fuel_shift
+
+# load_inputs (and pandas) is imported only to build a model from the csv
+# inputs, so that a model read from a snapshot (see snapshot.py) needs NumPy only
+
+
+# Year-indexed schedules of each generation
+schedules = ['constr_sched', 'depr_sched', 'fuel_sched', 'meth_sched', 'carb_sched']
+
+
+# The generations in the results come first (sorted like compute_lcoe()
+# sorts them), followed by backup sources which are not in the results.
+@dataclass
+class Model:
+    general_inputs: dict
+    names: list            # generations in the results
+    sources: list          # names + backup sources
+    years: np.ndarray      # start_yr..end_yr
+    params: dict           # scalar input -> (source,) array
+    schedules: dict        # schedule -> (distinct schedules, year) array
+    schedule_rows: dict    # schedule -> (source,) row of each generation's schedule
+    backup: np.ndarray     # (source,) index of the backup source, -1 for single sources
+    # Yearly capacity factor relative to cap_fac, (source, year); NaN rows
+    # (and None) for generations without an hourly profile
+    cf_shape: np.ndarray = None
+    # Yearly backup dispatch of each hybrid-source generation as a fraction
+    # of the backup capacity, (source, year); NaN rows (and None) for
+    # generations whose backup runs at the mean capacity factor of lcoe_calc.py
+    backup_cf_sched: np.ndarray = None
+    # Years between the online year of each generation and the one of
+    # 'years', (source,) ints; None when all generations share 'years'
+    # (see vintage.py). Absolute-year schedules are already shifted.
+    year_offset: np.ndarray = None
+    # Index into 'years' of the last year of operation of each generation,
+    # (source,) ints; None when all generations operate until the last year
+    end_index: np.ndarray = None
+
+    # Schedule of every generation as a (source, year) array
+    def schedule(self, k):
+        return self.schedules[k][self.schedule_rows[k]]
+
+    # Hybrid-source generations
+    @property
+    def hybrid(self):
+        return self.backup >= 0
+
+    # Renewable of each hybrid-source generation, the generation its inputs
+    # are copied from, as a (source,) index (-1 for single sources)
+    @cached_property
+    def renewable(self):
+        index = {name: i for i, name in enumerate(self.sources)}
+        return np.array([index.get(renewable_of(name), -1) if hybrid else -1
+                         for name, hybrid in zip(self.sources, self.hybrid)], dtype=int)
+
+    # Fuels with the EIA projection shift
+    @cached_property
+    def shift(self):
+        return uses_fuel_shift(self.sources)
+
+    # EIA fuel price relative to the start year price, (source, year)
+    @cached_property
+    def fuel_rel(self):
+        years = self.years if self.year_offset is None else self.years + self.year_offset[:, None]
+        return fuel_shift_factors(self.schedule('fuel_sched'), years)
+
+    # Generations with a decommissioning cost (nuclear, see lcoe_calc.py)
+    @cached_property
+    def decom(self):
+        return np.array([generation_of(name) == 'nuclear' for name in self.sources])
+
+    # What the discounted sums of each generation depend on besides WACC
+    # and fl_real: its schedules, whether its fuel follows the EIA
+    # projection (and from which year) and its last year, (source, key) array
+    @cached_property
+    def sum_keys(self):
+        keys = [self.schedule_rows[k] for k in schedules] + [self.shift]
+        if self.year_offset is not None:
+            keys.append(self.year_offset * self.shift)
+        if self.end_index is not None:
+            keys.append(self.end_index)
+        return np.column_stack(keys)
+
+    # Memory held by the arrays of the model
+    @property
+    def nbytes(self):
+        arrays = (list(self.params.values()) + list(self.schedules.values()) +
+                  list(self.schedule_rows.values()) + [self.years, self.backup] +
+                  [a for a in (self.cf_shape, self.backup_cf_sched,
+                               self.year_offset, self.end_index) if a is not None])
+        return sum(a.nbytes for a in arrays)
+
+
+# Generation of a result row: 'nuclear' of the vintage row 'nuclear @ 2030'
+# (see vintage.py)
+def generation_of(name):
+    return name.partition(' @ ')[0]
+
+
+# Renewable of a hybrid-source generation: 'solar' of 'solar_hybrid' and of
+# the combinations 'solar + gas @ 85%' of portfolio.py, 'solar @ 2030 (30
+# years)' of 'solar_hybrid @ 2030 (30 years)' (vintage.py)
+def renewable_of(name):
+    if ' + ' in name:
+        return name.partition(' + ')[0]
+    base = generation_of(name)
+    if base.find('hybrid') == -1:
+        return name
+    return base[:base.find('_')] + name[len(base):]
+
+
+# Scalar input of one generation (the same in every year)
+def scalar(frame, col):
+    if col not in frame or frame.empty:
+        return 0.0
+    value = float(frame[col].iloc[-1])
+    return 0.0 if np.isnan(value) else value
+
+
+# Schedule of one generation over 'years'
+def schedule(frame, col, years):
+    if col not in frame:
+        return np.zeros(len(years))
+    return (frame.set_index('year')[col].reindex(years)
+            .fillna(0).to_numpy(dtype=float))
+
+
+# Build the model from the inputs of each generation. 'frames' maps each
+# generation (including the backup source) to a data frame with a 'year'
+# column, its schedules and its scalar inputs; 'names' are the generations
+# in the results. The other generations of 'frames' (e.g. the backup
+# source) follow them in model.sources.
+def build_model(general_inputs, frames, names):
+    from load_inputs import backup_source, input_columns
+    years   = np.arange(general_inputs['start_yr'], general_inputs['end_yr'] + 1)
+    names   = sorted(names)
+    sources = names + sorted(name for name in frames if name not in names)
+    hybrid  = [name.find('hybrid') != -1 for name in names]
+    if any(hybrid) and backup_source not in sources:
+        raise ValueError('Hybrid-source generations need the inputs of %r' % (backup_source,))
+
+    params = {k: np.array([scalar(frames[name], k) for name in sources])
+              for k in input_columns}
+
+    # Store each distinct schedule once
+    sched, rows = {}, {}
+    for k in schedules:
+        dense = np.vstack([schedule(frames[name], k, years) for name in sources])
+        sched[k], inverse = np.unique(dense, axis=0, return_inverse=True)
+        rows[k] = inverse.reshape(-1)
+
+    # Fuels with the EIA projection use the start year price as fuel cost
+    shift = uses_fuel_shift(sources)
+    fuel  = sched['fuel_sched'][rows['fuel_sched']]
+    params['fl_c'] = np.where(shift, fuel[:, 0], params['fl_c'])
+
+    backup = np.array([sources.index(backup_source) if name.find('hybrid') != -1 else -1
+                       for name in sources])
+    return Model(dict(general_inputs), names, sources, years, params, sched, rows, backup)
+
+
+# Load the model directly from the input directory 'path', without
+# building the long data frame of load_inputs()
+def load_model(path=None, sources=None, cache_dir=None):
+    from load_inputs import load_general_inputs, load_rawdata, source, backup_source, default_input_dir
+    path    = default_input_dir if path is None else path
+    sources = source if sources is None else sources
+    general_inputs = load_general_inputs(path)
+    rawdata = load_rawdata(path, general_inputs, sources, cache_dir)
+    frames  = dict(tuple(rawdata.groupby('name')))
+    names   = [name for name in frames if name != backup_source]
+    return build_model(general_inputs, frames, names)
+
+
+# Build the model from the escalated inputs returned by load_inputs().
+# The backup source is taken from the 'backup_' columns of the hybrid rows.
+def model_from_inputs(inputs):
+    from load_inputs import backup_source
+    data   = inputs.data.fillna(0)
+    frames = dict(tuple(data.groupby('name')))
+    names  = list(frames)
+    hybrids = [name for name in names if name.find('hybrid') != -1]
+    if hybrids:
+        backup = frames[hybrids[0]]
+        backup = backup[['year'] + [col for col in backup.columns
+                                    if col.startswith('backup_')]]
+        frames[backup_source] = backup.rename(
+            columns=lambda col: col.replace('backup_', '', 1))
+    return build_model(inputs.general_inputs, frames, names)
+
+
+# The model restricted to the generations 'names' of model.names (in the
+# order of model.names), followed by the backup sources they need
+def select_sources(model, names):
+    for name in names:
+        if name not in model.names:
+            raise ValueError('Unknown generation: %r' % (name,))
+    names = [name for name in model.names if name in set(names)]
+    keep  = [model.sources.index(name) for name in names]
+    keep += sorted(set(model.backup[keep][model.backup[keep] >= 0].tolist()) - set(keep))
+    keep  = np.array(keep, dtype=int)
+
+    # Backup indices into the kept generations
+    position = np.full(len(model.sources), -1)
+    position[keep] = np.arange(len(keep))
+    backup = np.where(model.backup[keep] >= 0, position[model.backup[keep]], -1)
+    select = lambda a: None if a is None else a[keep]
+    return dataclasses.replace(
+        model, names=names, sources=[model.sources[i] for i in keep],
+        params={k: v[keep] for k, v in model.params.items()},
+        schedule_rows={k: v[keep] for k, v in model.schedule_rows.items()},
+        backup=backup, cf_shape=select(model.cf_shape),
+        backup_cf_sched=select(model.backup_cf_sched),
+        year_offset=select(model.year_offset), end_index=select(model.end_index))
@@ -0,0 +1,120 @@
+# Purpose: Incremental LCOE calculation which only recomputes the
+# generations whose input files changed since the last run.
+#
+# Every result row depends on a known set of input files: the generation's
+# own files (see load_inputs.source_files()), general.csv and, for
+# hybrid-source generations, their renewable source and the backup source.
+# A Pipeline remembers the file hashes of its last run and recomputes only
+# the rows that depend on a changed file; the other rows are reused.
+
+import json
+import os
+import pandas as pd
+from cache import file_hash
+from load_inputs import (load_inputs, source, source_files, backup_source,
+                         default_input_dir)
+from lcoe_calc import compute_lcoe
+
+
+# Files every generation depends on
+general_files = ['general.csv']
+
+
+# Map each input file to the set of result rows (generations) it feeds
+def dependents(sources=source):
+    deps = {}
+    for source_name in sources:
+        if source_name == backup_source:
+            continue
+        files = source_files(source_name) + general_files
+        if source_name.find('hybrid') != -1:
+            files = files + source_files(backup_source)
+        for f in files:
+            deps.setdefault(f, set()).add(source_name)
+    return deps
+
+
+class Pipeline:
+    # 'path' is the directory of inputs, 'cache_dir' (optional) the directory
+    # of the parsed-input cache. The file hashes and results of the last run are
+    # also kept there, so a new Pipeline on the same cache_dir starts warm.
+    def __init__(self, path=default_input_dir, sources=source, cache_dir=None):
+        self.path      = path
+        self.sources   = list(sources)
+        self.cache_dir = cache_dir
+        self.deps      = dependents(self.sources)
+        self.hashes    = {}      # file -> hash at the last run
+        self.results   = None    # results of the last run, indexed by name
+        if cache_dir is not None:
+            self.restore()
+
+    # Generations whose input files changed since the last run,
+    # and the current hashes of all input files
+    def changed_sources(self):
+        hashes  = {f: file_hash(os.path.join(self.path, f)) for f in self.deps}
+        changed = set()
+        for f, h in hashes.items():
+            if self.hashes.get(f) != h:
+                changed |= self.deps[f]
+        if self.results is None:
+            changed = set(self.results_names())
+        return [name for name in self.results_names() if name in changed], hashes
+
+    # Generations in the results (all but the backup source)
+    def results_names(self):
+        return [name for name in self.sources if name != backup_source]
+
+    # LCOE results of the generations 'names'. Only those generations, the
+    # renewables of the hybrids among them and the backup source are loaded.
+    def compute(self, names):
+        needed = set(names)
+        for source_name in names:
+            if source_name.find('hybrid') != -1:
+                needed.add(source_name[:source_name.find('_')])
+                needed.add(backup_source)
+        sources = [name for name in self.sources if name in needed]
+        output  = compute_lcoe(load_inputs(self.path, sources, self.cache_dir))
+        return output[output['name'].isin(names)].set_index('name')
+
+    # Bring the results up to date with the input files and return them
+    # (same layout as all_lcoe_results.csv)
+    def run(self):
+        names, hashes = self.changed_sources()
+        if names:
+            rows = self.compute(names)
+            if self.results is None:
+                self.results = rows
+            else:
+                self.results = pd.concat([self.results.drop(index=names, errors='ignore'),
+                                          rows])
+            self.results = self.results.sort_index()
+        self.hashes = hashes
+        if self.cache_dir is not None:
+            self.save()
+        return self.results.reset_index()
+
+    # Files keeping the state of the last run in cache_dir
+    def state_files(self):
+        return (os.path.join(self.cache_dir, 'pipeline_hashes.json'),
+                os.path.join(self.cache_dir, 'pipeline_results.csv'))
+
+    def save(self):
+        hashes_file, results_file = self.state_files()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.results.to_csv(results_file)
+        with open(hashes_file, 'w') as f:
+            json.dump({'sources': self.sources, 'hashes': self.hashes}, f)
+
+    # Start from the state of a previous run, if it was run on the same generations
+    def restore(self):
+        hashes_file, results_file = self.state_files()
+        try:
+            with open(hashes_file) as f:
+                state = json.load(f)
+            results = pd.read_csv(results_file, index_col='name',
+                                  float_precision='round_trip')
+        except (FileNotFoundError, ValueError):
+            return
+        if state['sources'] == self.sources:
+            self.hashes  = state['hashes']
+            self.results = results
@@ -0,0 +1,133 @@
+# Purpose: Screen hybrid-source combinations: every renewable x backup source
+# x equivalent capacity factor, evaluated in one batch and ranked by LCOE.
+#
+# Hybrid-source generations normally come from hand-written *_aux.csv files
+# and always use gas (advanced ct) as backup. Here the combinations are
+# enumerated from a spec instead: each one is a hybrid row of a Model (see
+# model.py) that takes its inputs from the renewable, its backup by index
+# from any generation, and its equiv_cap_fac from the spec. The combinations
+# share the schedules of their renewable, so the batch engine computes the
+# discounted sums of each renewable and each backup once for all of them.
+
+import argparse
+import itertools
+import json
+import numpy as np
+import pandas as pd
+from load_inputs import default_input_dir
+from model import Model, load_model
+from batch import compute_lcoe_batch, lcoe_cols
+
+
+# Column the combinations are ranked by
+rank_col = 'LCOE w/ Total Social Costs'
+
+
+# Name of the combination of 'renewable' backed up by 'backup' at 'level'
+# (equiv_cap_fac in %). The name starts with the renewable's name, which
+# tells whether its fuel follows the EIA projection (see escalation.py).
+def combination_name(renewable, backup, level):
+    return '%s + %s @ %g%%' % (renewable, backup, level)
+
+
+# Model of every combination of 'renewables', 'backups' and equivalent
+# capacity factors 'levels' (in %), built on the Model 'base' which holds
+# the renewables and the backups. The other hybrid inputs default to the
+# renewable's capacity (equiv_cap), the level (cap_fac_max), and the
+# general tax and wacc (hybrid_tax, hybrid_wacc). Returns the model, whose
+# results are the combinations, and a data frame describing them.
+def combination_model(base, renewables, backups, levels, equiv_cap=None,
+                      cap_fac_max=None, hybrid_tax=None, hybrid_wacc=None):
+    for name in list(renewables) + list(backups):
+        if name not in base.sources:
+            raise ValueError('Unknown generation: %r' % (name,))
+    combos = [(r, b, float(level)) for r, b, level in
+              itertools.product(renewables, backups, levels) if r != b]
+    if not combos:
+        raise ValueError('No combinations to evaluate')
+
+    # Combinations first, then the generations of the base model
+    n = len(combos)
+    primary = np.array([base.sources.index(r) for r, _, _ in combos])
+    backup  = np.array([base.sources.index(b) for _, b, _ in combos])
+    level   = np.array([lvl for _, _, lvl in combos])
+    general = base.general_inputs
+
+    params = {k: np.concatenate([v[primary], v]) for k, v in base.params.items()}
+    hybrid = {'equiv_cap':     base.params['cap'][primary] if equiv_cap is None else equiv_cap,
+              'equiv_cap_fac': level,
+              'cap_fac_max':   level if cap_fac_max is None else cap_fac_max,
+              'hybrid_tax':    general['tax'] if hybrid_tax is None else hybrid_tax,
+              'hybrid_wacc':   general['wacc'] if hybrid_wacc is None else hybrid_wacc}
+    for k, v in hybrid.items():
+        params[k][:n] = v
+
+    names = [combination_name(*combo) for combo in combos]
+    rows  = {k: np.concatenate([v[primary], v]) for k, v in base.schedule_rows.items()}
+    model = Model(dict(general), names, names + list(base.sources), base.years, params,
+                  base.schedules, rows,
+                  np.concatenate([n + backup, np.where(base.backup >= 0, base.backup + n, -1)]))
+
+    # Mean capacity factor the backup has to run at (0..1), as in lcoe_calc.py
+    cap = base.params['cap']
+    b_cf_mean = ((params['equiv_cap'][:n] * level / 100.0 -
+                  cap[primary] * base.params['cap_fac'][primary] / 100.0) / cap[backup])
+    info = pd.DataFrame({'name': names,
+                         'renewable': [r for r, _, _ in combos],
+                         'backup': [b for _, b, _ in combos],
+                         'equiv_cap_fac': level,
+                         'backup_cf_mean': b_cf_mean,
+                         'feasible': (b_cf_mean >= 0) & (b_cf_mean <= 1)})
+    return model, info
+
+
+# LCOE of every combination (in every scenario, see batch.py), ranked by
+# rank_col within each scenario. Infeasible combinations (the backup would
+# have to run below 0% or above 100%) are ranked last.
+def rank_combinations(model, info, scenarios=None):
+    output = compute_lcoe_batch(model, scenarios)
+    output = output.merge(info, on='name', how='left')
+    order  = output[rank_col].where(output['feasible'], np.inf)
+    output['rank'] = order.groupby(output['scenario']).rank(method='first').astype(int)
+    cols = (['scenario', 'rank', 'name', 'renewable', 'backup', 'equiv_cap_fac',
+             'backup_cf_mean', 'feasible', 'Online year'] + lcoe_cols)
+    return output.sort_values(['scenario', 'rank'])[cols].reset_index(drop=True)
+
+
+# Load the renewables and backups of 'spec' from 'path' and rank their
+# combinations. 'spec' is a dictionary like
+#   {"renewables": ["solar", "wind"],
+#    "backups": ["gas (advanced ct)", "gas", "nuclear"],
+#    "equiv_cap_fac": [70, 85, 95]}
+# optionally with "hybrid_tax", "hybrid_wacc", "equiv_cap" and "cap_fac_max".
+def screen(spec, path=default_input_dir, scenarios=None, cache_dir=None):
+    renewables, backups = spec['renewables'], spec['backups']
+    base = load_model(path, list(dict.fromkeys(list(renewables) + list(backups))), cache_dir)
+    model, info = combination_model(
+        base, renewables, backups, spec['equiv_cap_fac'],
+        **{k: spec[k] for k in ['equiv_cap', 'cap_fac_max', 'hybrid_tax', 'hybrid_wacc']
+           if k in spec})
+    return rank_combinations(model, info, scenarios)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rank renewable x backup x equiv_cap_fac combinations.')
+    parser.add_argument('--inputs', default=default_input_dir, help='input directory')
+    parser.add_argument('--spec', default=None, help='JSON file of the combinations (see screen())')
+    parser.add_argument('--renewables', nargs='+', default=['hydro', 'solar', 'wind', 'offshore wind'])
+    parser.add_argument('--backups', nargs='+', default=['gas (advanced ct)'])
+    parser.add_argument('--levels', type=float, nargs='+', default=[85],
+                        help='equivalent capacity factors in %% (default: %(default)s)')
+    parser.add_argument('-o', '--output', default='hybrid_combinations.csv',
+                        help='ranked combinations (default: %(default)s)')
+    args = parser.parse_args()
+
+    if args.spec:
+        with open(args.spec) as f:
+            spec = json.load(f)
+    else:
+        spec = {'renewables': args.renewables, 'backups': args.backups,
+                'equiv_cap_fac': args.levels}
+    ranking = screen(spec, args.inputs).drop(columns='scenario')
+    ranking.to_csv(args.output, index=False)
+    print(ranking[['rank', 'name', 'feasible', rank_col]].head(10).to_string(index=False))
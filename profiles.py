@@ -0,0 +1,154 @@
+# Purpose: Hourly generation profiles: the capacity factor of each year and
+# the backup dispatch of hybrid-source generations, reduced from 8760- or
+# 8766-hour profiles instead of the single cap_fac of each generation.
+#
+# A profile is a .npy file (float32 or float64) shaped (year, hour) holding
+# the output of every hour as a fraction of capacity (0..1), one row per
+# year from start_yr; the last row is used for the years after it, so a
+# profile of one row (or a 1-D array) is a typical year. The profile of a
+# hybrid-source generation is its own file, or else the file of its
+# renewable. Profiles are memory-mapped and reduced a block of years at a
+# time, so they are never loaded whole.
+#
+# From the profile of a generation come
+#   - its yearly capacity factors: cap_fac becomes their mean over the
+#     years of operation and model.cf_shape their ratio to it, so that a
+#     scenario override of cap_fac scales the whole profile,
+#   - for a hybrid-source generation the hourly backup dispatch: the backup
+#     covers what the renewable falls short of equiv_cap * equiv_cap_fac in
+#     every hour, up to the backup capacity. Its yearly mean is the backup
+#     capacity factor (model.backup_cf_sched) and its mean over the years of
+#     operation weights the social costs (r_sc_w/b_sc_w in lcoe_calc.py).
+# The dispatch is reduced from the inputs of the model, so scenario
+# overrides of equiv_cap, equiv_cap_fac and the backup's cap do not change it.
+#
+# With a flat float64 profile at cap_fac the results are those of
+# lcoe_calc.py; a float32 profile rounds the capacity factors.
+
+import argparse
+import dataclasses
+import os
+import re
+import numpy as np
+from load_inputs import default_input_dir
+from model import load_model, renewable_of
+from batch import compute_lcoe_batch
+
+
+# Values of the profiles reduced at a time (bounds the memory of a block)
+default_chunk_size = 1 << 22
+
+
+# File of the profile of one generation
+def profile_path(profile_dir, name):
+    return os.path.join(profile_dir, re.sub(r'[^A-Za-z0-9]+', '_', name) + '.npy')
+
+
+# Write 'profile' (year, hour) or (hour,) of generation 'name' to 'profile_dir'.
+# The profile keeps its float type unless 'dtype' is given: float32 halves
+# the file, at the cost of rounding the capacity factors (~1e-7 relative).
+def save_profile(profile_dir, name, profile, dtype=None):
+    profile = np.asarray(profile)
+    if dtype is None:
+        dtype = profile.dtype if np.issubdtype(profile.dtype, np.floating) else float
+    profile = profile.astype(dtype, copy=False)
+    if profile.ndim not in (1, 2):
+        raise ValueError('A profile must be shaped (year, hour) or (hour,)')
+    os.makedirs(profile_dir, exist_ok=True)
+    np.save(profile_path(profile_dir, name), profile)
+
+
+# Profile of generation 'name' in 'profile_dir', memory-mapped, or None
+def open_profile(profile_dir, name):
+    for candidate in dict.fromkeys([name, renewable_of(name)]):
+        path = profile_path(profile_dir, candidate)
+        if os.path.exists(path):
+            profile = np.atleast_2d(np.load(path, mmap_mode='r'))
+            if profile.ndim != 2 or not profile.shape[1]:
+                raise ValueError('The profile %s must be shaped (year, hour)' % path)
+            return profile
+    return None
+
+
+# Yearly means over the first 'n_years' of 'profile' (year, hour) and of the
+# backup dispatch clip(target - cap * profile, 0, b_cap) / b_cap for each
+# element of the arrays 'target', 'cap' and 'b_cap' (the hybrids using the
+# profile). Returns the (year,) capacity factors and the (hybrid, year)
+# dispatch; the last profile year is repeated up to 'n_years'.
+def reduce_profile(profile, n_years, target=(), cap=(), b_cap=(), chunk_size=default_chunk_size):
+    target, cap, b_cap = (np.asarray(a, dtype=float)[:, None, None] for a in (target, cap, b_cap))
+    rows, n_hours = min(len(profile), n_years), profile.shape[1]
+    step = max(1, chunk_size // (n_hours * (len(target) + 1)))
+    cf = np.empty(rows)
+    dispatch = np.empty((len(target), rows))
+    for lo in range(0, rows, step):
+        block = np.asarray(profile[lo:lo + step], dtype=float)
+        cf[lo:lo + step] = block.mean(axis=1)
+        if len(target):
+            backup = np.clip(target - cap * block, 0, b_cap)
+            dispatch[:, lo:lo + step] = backup.mean(axis=2) / b_cap[..., 0]
+    pad = n_years - rows
+    return np.pad(cf, (0, pad), mode='edge'), np.pad(dispatch, ((0, 0), (0, pad)), mode='edge')
+
+
+# The Model 'model' with the capacity factors of the generations which have
+# a profile in 'profile_dir' reduced from it (see the top of this file).
+# Generations without a profile keep their scalar inputs.
+def with_profiles(model, profile_dir, chunk_size=default_chunk_size):
+    n, n_years = len(model.sources), len(model.years)
+    op = model.years > model.general_inputs['period_0_yr']
+    params   = dict(model.params, cap_fac=model.params['cap_fac'].copy())
+    cf_shape = np.full((n, n_years), np.nan)
+    dispatch = np.full((n, n_years), np.nan)
+
+    # Generations sharing a profile are reduced in one pass over it
+    users = {}
+    for i, name in enumerate(model.sources):
+        path = profile_path(profile_dir, name)
+        owner = name if os.path.exists(path) else renewable_of(name)
+        users.setdefault(owner, []).append(i)
+    for owner, rows in users.items():
+        profile = open_profile(profile_dir, owner)
+        if profile is None:
+            continue
+        rows = np.array(rows)
+        h = rows[model.hybrid[rows]]
+        b = model.backup[h]
+        target = params['equiv_cap'][h] * params['equiv_cap_fac'][h] / 100.0
+        cf, backup = reduce_profile(profile, n_years, target, params['cap'][h],
+                                    params['cap'][b], chunk_size)
+
+        mean = cf[op].mean() if op.any() else cf.mean()
+        params['cap_fac'][rows] = mean * 100
+        cf_shape[rows] = cf / mean if mean else 0.0
+        dispatch[h] = backup
+
+    found = ~np.isnan(cf_shape[:, 0])
+    if not found.any():
+        raise ValueError('No profiles of the generations in %s' % profile_dir)
+    return dataclasses.replace(model, params=params, cf_shape=cf_shape,
+                               backup_cf_sched=dispatch if model.hybrid[found].any() else None)
+
+
+# Model of the inputs in 'path' with the profiles of 'profile_dir'
+def load_profile_model(path=default_input_dir, profile_dir='profiles', cache_dir=None,
+                       chunk_size=default_chunk_size):
+    return with_profiles(load_model(path, cache_dir=cache_dir), profile_dir, chunk_size)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='LCOE with capacity factors from hourly profiles.')
+    parser.add_argument('--inputs', default=default_input_dir, help='input directory')
+    parser.add_argument('--profiles', default='profiles',
+                        help='directory of the <generation>.npy profiles (default: %(default)s)')
+    parser.add_argument('-o', '--output', default='profile_lcoe_results.csv',
+                        help='LCOE results (default: %(default)s)')
+    args = parser.parse_args()
+
+    model  = load_profile_model(args.inputs, args.profiles)
+    output = compute_lcoe_batch(model).drop(columns='scenario')
+    output.to_csv(args.output)
+    profiled = ~np.isnan(model.cf_shape[:len(model.names), 0])
+    for name, cap_fac in zip(np.array(model.names)[profiled],
+                             model.params['cap_fac'][:len(model.names)][profiled]):
+        print('%-20s mean capacity factor %.2f%%' % (name, cap_fac))
@@ -0,0 +1,126 @@
+# Purpose: Run the LCOE calculation over many input directories
+# (one per region / policy case) on a pool of worker processes.
+#
+# Each case is a csv_inputs-style directory. The results of every case are
+# tagged with its case id and streamed into one combined output as soon as
+# the case finishes. A case that fails is reported and the sweep goes on.
+
+import argparse
+import glob
+import os
+import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+from load_inputs import load_inputs, source
+from lcoe_calc import compute_lcoe
+from store import clear_output, formats, write_results
+
+
+# Expand a list of directories and glob patterns into input directories
+def expand_cases(patterns):
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        paths.extend(p for p in matches if os.path.isdir(p))
+    # Keep the first occurrence of each directory
+    return list(dict.fromkeys(os.path.normpath(p) for p in paths))
+
+
+# Case id of each input directory: its path relative to the common parent
+# of all cases, so that e.g. 'east/base' and 'west/base' stay distinct
+def case_ids(paths):
+    if not paths:
+        raise ValueError('No case directories matched')
+    if len(paths) == 1:
+        return [os.path.basename(os.path.abspath(paths[0]))]
+    parent = os.path.commonpath([os.path.abspath(p) for p in paths])
+    return [os.path.relpath(os.path.abspath(p), parent).replace(os.sep, '/')
+            for p in paths]
+
+
+# LCOE results of one case, with the case id as first column,
+# and the general inputs of the case. Runs in a worker process.
+def run_case(case, path, sources=source, cache_dir=None):
+    if cache_dir is not None:
+        cache_dir = os.path.join(cache_dir, case.replace('/', '__'))
+    inputs = load_inputs(path, sources, cache_dir)
+    output = compute_lcoe(inputs)
+    output.insert(0, 'case', case)
+    return output, inputs.general_inputs
+
+
+# Run every case and return (results, errors): the combined results of the
+# cases that succeeded, in the order of 'paths', and {case id: error message}
+# for the cases that failed. If 'output' is given, the results of each case
+# are written there as soon as the case finishes: appended to one csv file,
+# or (format='parquet') as the case's partition of a Parquet dataset.
+# 'workers' is the number of processes (default: one per CPU); with
+# workers=1 the cases run one after another in this process.
+def run_cases(paths, workers=None, output=None, sources=source, cache_dir=None,
+              format='csv'):
+    paths   = list(paths)
+    cases   = case_ids(paths)
+    results = {}
+    errors  = {}
+    if output is not None:
+        clear_output(output)
+
+    # Store the results of one case (or its error)
+    def collect(case, get_result):
+        try:
+            result, general_inputs = get_result()
+        except Exception as e:
+            errors[case] = ''.join(traceback.format_exception_only(type(e), e)).strip()
+            return
+        results[case] = result
+        if output is None:
+            return
+        if format == 'csv':
+            result.to_csv(output, mode='a', index=False,
+                          header=not os.path.exists(output))
+        else:
+            write_results(result, output, format, general_inputs)
+
+    if workers == 1:
+        for case, path in zip(cases, paths):
+            collect(case, lambda: run_case(case, path, sources, cache_dir))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(run_case, case, path, sources, cache_dir): case
+                       for case, path in zip(cases, paths)}
+            for future in as_completed(futures):
+                collect(futures[future], future.result)
+
+    done = [results[case] for case in cases if case in results]
+    combined = pd.concat(done, ignore_index=True) if done else pd.DataFrame()
+    return combined, errors
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the LCOE calculation over many input directories.')
+    parser.add_argument('cases', nargs='+', help='input directories or glob patterns')
+    parser.add_argument('-o', '--output', default=None,
+                        help='combined output (default: all_cases_lcoe_results.csv, '
+                             'or the directory all_cases_lcoe_results for Parquet)')
+    parser.add_argument('--format', choices=formats, default='csv',
+                        help='csv file or Parquet dataset partitioned by case and '
+                             'generation (default: %(default)s)')
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help='number of worker processes (default: one per CPU)')
+    parser.add_argument('--cache-dir', default=None,
+                        help='directory of the parsed-input cache (one subdirectory per case)')
+    args = parser.parse_args()
+
+    output = args.output or ('all_cases_lcoe_results' +
+                             ('.csv' if args.format == 'csv' else ''))
+
+    paths = expand_cases(args.cases)
+    if not paths:
+        parser.error('no case directories matched %s' % ' '.join(args.cases))
+    _, errors = run_cases(paths, args.workers, output, cache_dir=args.cache_dir,
+                          format=args.format)
+    for case, error in errors.items():
+        print('%s failed: %s' % (case, error), file=sys.stderr)
+    print('%d of %d cases written to %s' % (len(paths) - len(errors), len(paths), output))
+    sys.exit(1 if errors else 0)
@@ -0,0 +1,69 @@
+# Purpose: Sensitivities (partial derivatives) of every LCOE result column
+# with respect to the general inputs and the inputs of each generation.
+#
+# The derivatives are computed with the complex step: an input x is given the
+# value x + i*h, the calculation is done in complex arithmetic and
+# Im(result) / h is the derivative. This is forward-mode differentiation of
+# the formulas of batch.py. Unlike finite differences nothing is subtracted,
+# so the derivatives are exact to rounding error even for a tiny step. Each
+# perturbed input is one scenario of the batch calculation, so all
+# derivatives come out of a single vectorized evaluation instead of two
+# full reruns per input.
+
+import numpy as np
+import pandas as pd
+from batch import evaluate, general_params, lcoe_cols, prepare, source_params
+
+
+# Imaginary step of the complex-step derivative
+step = 1e-20
+
+
+# Default inputs to differentiate by: the general inputs and every
+# input of every generation ('<source>:<param>', see batch.py). The
+# derivative by an input of a renewable includes its effect on the
+# hybrid-source generations built from it, as for an edit of its csv file.
+def default_params(model):
+    return list(general_params) + ['%s:%s' % (name, k)
+                                   for name in model.sources for k in source_params]
+
+
+# Value of the input 'param' (a scenario column of batch.py) in the model
+def base_value(model, param):
+    if param in general_params:
+        return float(model.general_inputs[param])
+    name, _, k = param.rpartition(':')
+    if k not in source_params or name not in model.sources:
+        raise ValueError('Unknown input: %r' % (param,))
+    return float(model.params[k][model.sources.index(name)])
+
+
+# Partial derivatives of the LCOE results with respect to 'params'
+# (default: default_params()). 'inputs' is the Inputs returned by
+# load_inputs() or a Model. Returns a data frame with one row per
+# generation and input: 'name', 'param', its 'value' and the derivative of
+# every column of lcoe_cols. With elasticity=True the derivatives are
+# scaled to elasticities, d(result)/d(input) * input / result.
+def sensitivities(inputs, params=None, elasticity=False, chunk_size=1024):
+    model  = prepare(inputs)
+    params = default_params(model) if params is None else list(params)
+    values = np.array([base_value(model, param) for param in params])
+
+    # Scenario i perturbs input i by the imaginary step and leaves the others
+    # unset (NaN, see batch.py), so that the perturbation of a renewable
+    # reaches its hybrid-source generations
+    perturbed = np.arange(len(params))
+    scenarios = pd.DataFrame({param: np.where(perturbed == i, values[i] + 1j * step, np.nan)
+                              for i, param in enumerate(params)})
+    results = evaluate(model, scenarios, chunk_size)
+
+    output = pd.DataFrame({'name':  np.tile(model.names, len(params)),
+                           'param': np.repeat(params, len(model.names)),
+                           'value': np.repeat(values, len(model.names))})
+    for col in lcoe_cols:
+        deriv = results[col].imag / step
+        if elasticity:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                deriv = np.where(deriv != 0, deriv * values[:, None] / results[col].real, 0)
+        output[col] = deriv.ravel()
+    return output
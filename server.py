@@ -0,0 +1,260 @@
+# Purpose: Local HTTP service answering LCOE queries from a model kept in memory.
+#
+# The inputs are loaded once at start-up. A query is a JSON object of input
+# overrides (the scenario columns of batch.py, e.g. {"wacc": 5,
+# "nuclear:on_c": 7000}); the reply holds the all_lcoe_results columns of
+# every generation. Queries arriving at the same time are collected into one
+# scenario table and evaluated together by the batch engine, so many
+# concurrent clients cost one vectorized evaluation instead of one each.
+#
+#   POST /lcoe     body: {overrides} or [{overrides}, ...]
+#   GET  /lcoe?wacc=5&nuclear:on_c=7000
+#   GET  /params   accepted inputs and their baseline values
+#   GET  /health
+#
+# Only the standard library (asyncio) is used for the server.
+
+import argparse
+import asyncio
+import json
+import math
+import sys
+import traceback
+from urllib.parse import parse_qsl, urlsplit
+import numpy as np
+from batch import evaluate, lcoe_cols, prepare
+from model import load_model
+from load_inputs import default_input_dir
+from sensitivity import base_value, default_params
+
+
+# Longest wait for more queries before a batch is evaluated (seconds).
+# With 0 a batch holds the queries which arrived while the previous batch
+# was being evaluated, so batches grow with the load without adding latency.
+default_max_wait = 0.0
+
+# Most scenarios evaluated in one batch
+default_max_batch = 4096
+
+# Largest request body accepted (bytes)
+max_body = 1 << 20
+
+reasons = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           500: 'Internal Server Error'}
+
+
+# Error reported to the client as 400 Bad Request
+class QueryError(ValueError):
+    pass
+
+
+# Evaluates the queries of concurrent clients in batches
+class LcoeService:
+    def __init__(self, inputs, max_wait=default_max_wait, max_batch=default_max_batch):
+        self.model     = prepare(inputs)
+        self.max_wait  = max_wait
+        self.max_batch = max_batch
+        self.queue     = None
+        self.baseline  = {param: base_value(self.model, param)
+                          for param in default_params(self.model)}
+        self.batches   = 0
+        self.scenarios = 0
+
+    # Check the overrides of one scenario and convert them to floats
+    def check(self, overrides):
+        if not isinstance(overrides, dict):
+            raise QueryError('A scenario must be a JSON object of input overrides')
+        checked = {}
+        for param, value in overrides.items():
+            if param not in self.baseline:
+                raise QueryError('Unknown input: %r' % (param,))
+            try:
+                checked[param] = float(value)
+            except (TypeError, ValueError):
+                raise QueryError('Input %r must be a number' % (param,))
+        return checked
+
+    # Results of a list of scenarios (dicts of overrides), one list of
+    # rows (one per generation) per scenario
+    async def query(self, scenarios):
+        scenarios = [self.check(s) for s in scenarios]
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((scenarios, future))
+        return await future
+
+    # Collect queued queries into batches and evaluate them
+    async def run(self):
+        self.queue = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            size  = len(batch[0][0])
+            deadline = loop.time() + self.max_wait
+            while size < self.max_batch:
+                timeout = deadline - loop.time()
+                try:
+                    if timeout <= 0:
+                        item = self.queue.get_nowait()
+                    else:
+                        item = await asyncio.wait_for(self.queue.get(), timeout)
+                except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                    break
+                batch.append(item)
+                size += len(item[0])
+            scenarios = [s for item, _ in batch for s in item]
+            try:
+                rows = await loop.run_in_executor(None, self.evaluate, scenarios)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (item, future), lo in zip(batch, np.cumsum([0] + [len(i) for i, _ in batch])):
+                if not future.done():
+                    future.set_result(rows[lo:lo + len(item)])
+
+    # Evaluate scenarios (dicts of overrides) in one batch. Inputs not
+    # overridden by a scenario are left unset (NaN), as if it were evaluated
+    # alone: a '<renewable>:<param>' override then also reaches its hybrid
+    # even if another scenario of the batch sets '<hybrid>:<param>'.
+    def evaluate(self, scenarios):
+        params  = sorted({param for s in scenarios for param in s})
+        columns = {param: np.array([s.get(param, np.nan) for s in scenarios])
+                   for param in params}
+        n = len(scenarios)
+        results = evaluate(self.model, columns if params else None)
+        if not params:
+            results = {col: np.repeat(v, n, axis=0) for col, v in results.items()}
+        self.batches   += 1
+        self.scenarios += n
+        online = int(self.model.general_inputs['period_0_yr']) + 1
+        return [[dict({'name': name, 'Online year': online},
+                      **{col: number(results[col][i, j]) for col in lcoe_cols})
+                 for j, name in enumerate(self.model.names)]
+                for i in range(n)]
+
+
+# JSON number (NaN and infinity become null)
+def number(x):
+    x = float(x)
+    return x if math.isfinite(x) else None
+
+
+################### HTTP ###################
+
+# Read one HTTP request: (method, target, headers, body), or None at end of stream
+async def read_request(reader):
+    line = await reader.readline()
+    if not line:
+        return None
+    method, target, _ = line.decode('latin-1').split(' ', 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        key, _, value = line.decode('latin-1').partition(':')
+        headers[key.strip().lower()] = value.strip()
+    length = int(headers.get('content-length', 0))
+    if length > max_body:
+        raise QueryError('Request body too large')
+    body = await reader.readexactly(length) if length else b''
+    return method, target, headers, body
+
+
+def write_response(writer, status, payload, keep_alive):
+    body = json.dumps(payload).encode()
+    head = ('HTTP/1.1 %d %s\r\nContent-Type: application/json\r\n'
+            'Content-Length: %d\r\nConnection: %s\r\n\r\n'
+            % (status, reasons[status], len(body), 'keep-alive' if keep_alive else 'close'))
+    writer.write(head.encode() + body)
+
+
+# Reply to one request: (status, payload)
+async def handle(service, method, target, body):
+    url = urlsplit(target)
+    if url.path == '/health':
+        return 200, {'status': 'ok', 'batches': service.batches, 'scenarios': service.scenarios}
+    if url.path == '/params':
+        return 200, service.baseline
+    if url.path != '/lcoe':
+        return 404, {'error': 'Unknown path: %s' % url.path}
+
+    if method == 'GET':
+        rows = await service.query([dict(parse_qsl(url.query))])
+        return 200, rows[0]
+    if method != 'POST':
+        return 405, {'error': 'Use GET or POST'}
+    try:
+        scenarios = json.loads(body or b'{}')
+    except ValueError:
+        raise QueryError('The body must be JSON')
+    if isinstance(scenarios, list):
+        return 200, await service.query(scenarios)
+    rows = await service.query([scenarios])
+    return 200, rows[0]
+
+
+# Serve the requests of one connection (HTTP/1.1 keep-alive)
+async def serve_connection(service, reader, writer):
+    try:
+        while True:
+            try:
+                request = await read_request(reader)
+            except QueryError as e:
+                write_response(writer, 400, {'error': str(e)}, False)
+                break
+            except ValueError:
+                write_response(writer, 400, {'error': 'Malformed request'}, False)
+                break
+            if request is None:
+                break
+            method, target, headers, body = request
+            keep_alive = headers.get('connection', '').lower() != 'close'
+            try:
+                status, payload = await handle(service, method, target, body)
+            except QueryError as e:
+                status, payload = 400, {'error': str(e)}
+            except Exception as e:
+                # Any other failure (e.g. of the evaluation) is reported to
+                # the client and logged, and the connection is kept
+                print('Error serving %s %s:' % (method, target), file=sys.stderr)
+                traceback.print_exc()
+                status, payload = 500, {'error': 'Internal error: %s' % e}
+            write_response(writer, status, payload, keep_alive)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+# Run the service on host:port until interrupted
+async def serve(service, host='127.0.0.1', port=8765):
+    batcher = asyncio.create_task(service.run())
+    server  = await asyncio.start_server(
+        lambda r, w: serve_connection(service, r, w), host, port)
+    print('Serving LCOE queries on http://%s:%d/lcoe' % (host, port))
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        batcher.cancel()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve LCOE queries over HTTP.')
+    parser.add_argument('--inputs', default=default_input_dir, help='input directory')
+    parser.add_argument('--host', default='127.0.0.1', help='address (default: %(default)s)')
+    parser.add_argument('--port', type=int, default=8765, help='port (default: %(default)s)')
+    parser.add_argument('--max-wait', type=float, default=default_max_wait,
+                        help='seconds to wait for more queries to batch (default: %(default)s)')
+    args = parser.parse_args()
+
+    service = LcoeService(load_model(args.inputs), max_wait=args.max_wait)
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,77 @@
+# Purpose: Binary snapshot of the compact model (model.py) of an input directory.
+#
+# The snapshot is one uncompressed .npz file holding the arrays of the Model:
+# the general inputs, the scalar inputs of every generation, each distinct
+# schedule and the backup indices. Reading it needs NumPy only, so a short-
+# lived run skips importing pandas and parsing the csv inputs. The snapshot
+# also holds the content key of the input files it was built from (see
+# cache.py), so a stale snapshot can be detected and rebuilt.
+
+import json
+import os
+import numpy as np
+from cache import content_key
+from model import Model, load_model
+
+# Optional arrays of the model, stored when present
+optional = ['cf_shape', 'backup_cf_sched', 'year_offset', 'end_index']
+
+
+# Key of the input files in the directory 'path'
+def input_key(path):
+    return content_key(path, [f for f in os.listdir(path) if f.endswith('.csv')])
+
+
+# Write 'model' to the snapshot 'path' with the key 'key' of its inputs.
+# The file is replaced atomically.
+def save_snapshot(model, path, key=''):
+    arrays = {'key': np.array(key),
+              'general_inputs': np.array(json.dumps(model.general_inputs)),
+              'names': np.array(model.names, dtype=str),
+              'sources': np.array(model.sources, dtype=str),
+              'years': model.years,
+              'backup': model.backup}
+    for k, v in model.params.items():
+        arrays['params/' + k] = v
+    for k in model.schedules:
+        arrays['schedules/' + k] = model.schedules[k]
+        arrays['rows/' + k] = model.schedule_rows[k]
+    for k in optional:
+        if getattr(model, k) is not None:
+            arrays[k] = getattr(model, k)
+    tmp = '%s.%d.tmp.npz' % (path, os.getpid())
+    np.savez(tmp, **arrays)
+    os.replace(tmp, path)
+
+
+# Read the model from the snapshot 'path'. Returns None if there is no
+# snapshot or (when 'key' is given) it was built from other inputs.
+def read_snapshot(path, key=None):
+    try:
+        with np.load(path, allow_pickle=False) as f:
+            if key is not None and str(f['key']) != key:
+                return None
+            group = lambda prefix: {k[len(prefix):]: f[k] for k in f.files if k.startswith(prefix)}
+            return Model(json.loads(str(f['general_inputs'])),
+                         f['names'].tolist(), f['sources'].tolist(), f['years'],
+                         group('params/'), group('schedules/'), group('rows/'), f['backup'],
+                         **{k: f[k] for k in optional if k in f.files})
+    except (FileNotFoundError, KeyError, ValueError, OSError):
+        return None
+
+
+# Model of the input directory 'inputs', read from the snapshot 'path'.
+# With 'inputs' the snapshot is checked against the input files and
+# rebuilt if it is missing or stale; without, it is read as is.
+def load_snapshot(path, inputs=None):
+    if inputs is None:
+        model = read_snapshot(path)
+        if model is None:
+            raise ValueError('Cannot read the snapshot %s' % path)
+        return model
+    key   = input_key(inputs)
+    model = read_snapshot(path, key)
+    if model is None:
+        model = load_model(inputs)
+        save_snapshot(model, path, key)
+    return model
@@ -0,0 +1,125 @@
+# Purpose: Break-even and target queries: the value of one input at which a
+# generation reaches a target LCOE, or at which two generations cost the same.
+#
+# The queries run on a Model (model.py) which is prepared once, and each
+# trial value is one scenario of the batch calculation (batch.py).
+# The LCOE is linear in many inputs (overnight cost, O&M costs, fuel cost,
+# transmission cost, emissions, carbon price scaling). For those the answer
+# is found in closed form from two evaluations. Other inputs (wacc, tax,
+# capacity factors, ...) are found by root-finding: the bracket is
+# evaluated on a grid of trial values at once and narrowed around the first
+# sign change until the root is pinned down.
+
+import numpy as np
+from batch import evaluate, general_params, lcoe_cols, prepare, source_params
+
+
+# Inputs of each generation which the results depend on linearly. For coal,
+# gas and nuclear fl_c scales the fuel price schedule (see batch.py).
+linear_params = ['on_c', 'fx_om_c', 'vr_om_c', 'fl_c', 'heat_rate', 'waste_fee',
+                 'trans_cost', 'non_carbon_c', 'kgCO2 per MWh', 'leak_rate']
+
+# Factor applied to the carbon price schedule (1 = the schedule as given)
+carbon_scale = 'carbon_scale'
+
+# Columns which depend on the carbon price, and how: 'Effective SCC' scales
+# with the carbon price, the others by the carbon cost
+carbon_cols = ['Effective SCC', 'Carbon', 'GHG External Costs', 'LCOE w/ Total Social Costs']
+
+# Trial values per round of the root-finding
+grid_points = 33
+
+
+# Solver of the target and parity queries on one set of inputs.
+# 'inputs' is the Inputs returned by load_inputs() or a Model.
+class Solver:
+    def __init__(self, inputs):
+        self.model = prepare(inputs)
+        self.base  = {col: v[0] for col, v in evaluate(self.model).items()}
+
+    # Index of generation 'name' in the results
+    def index(self, name):
+        if name not in self.model.names:
+            raise ValueError('Unknown generation: %r' % (name,))
+        return self.model.names.index(name)
+
+    # Current value of the input 'param' ('wacc', 'carbon_scale' or '<source>:<param>')
+    def value(self, param):
+        if param == carbon_scale:
+            return 1.0
+        if param in general_params:
+            return float(self.model.general_inputs[param])
+        name, _, k = param.rpartition(':')
+        if k not in source_params or name not in self.model.sources:
+            raise ValueError('Unknown input: %r' % (param,))
+        return float(self.model.params[k][self.model.sources.index(name)])
+
+    # Whether the results depend linearly on 'param'
+    def is_linear(self, param):
+        return param == carbon_scale or param.rpartition(':')[2] in linear_params
+
+    # Result 'column' of every generation for each value of 'param' in
+    # 'values', as a (value, generation) array
+    def results(self, param, values, column):
+        values = np.asarray(values, dtype=float)
+        if param != carbon_scale:
+            return evaluate(self.model, {param: values})[column]
+        base = self.base[column][None, :]
+        if column == 'Effective SCC':
+            return values[:, None] * base
+        if column in carbon_cols:
+            return base + (values[:, None] - 1) * self.base['Carbon'][None, :]
+        return np.repeat(base, len(values), axis=0)
+
+    # Value of 'param' at which the 'column' of generation 'name' equals 'target'.
+    # 'bracket' (lo, hi) limits the search for inputs that are not linear.
+    def target(self, name, param, target, column='LCOE base', bracket=None):
+        i = self.index(name)
+        return self.solve(param, column, lambda r: r[:, i] - target, bracket)
+
+    # Value of 'param' at which 'column' is the same for 'name' and 'other'
+    def parity(self, name, other, param, column='LCOE base', bracket=None):
+        i, j = self.index(name), self.index(other)
+        return self.solve(param, column, lambda r: r[:, i] - r[:, j], bracket)
+
+    # Root of residual(results) as a function of 'param'
+    def solve(self, param, column, residual, bracket=None):
+        if column not in lcoe_cols:
+            raise ValueError('Unknown result column: %r' % (column,))
+        x0 = self.value(param)
+        f  = lambda values: residual(self.results(param, values, column))
+        if self.is_linear(param) and bracket is None:
+            return linear_root(f, x0)
+        if bracket is None:
+            bracket = (0.0, 4 * x0) if x0 > 0 else (0.0, 100.0)
+        return find_root(f, *bracket)
+
+
+# Root of a linear function f, from its values at x0 and x0 + dx
+def linear_root(f, x0):
+    dx = max(abs(x0), 1.0)
+    y0, y1 = f([x0, x0 + dx])
+    if y1 == y0:
+        raise ValueError('The result does not depend on this input')
+    return x0 - y0 * dx / (y1 - y0)
+
+
+# Root of f in [lo, hi]: the bracket is evaluated on a grid and narrowed
+# to the grid cell of the first sign change until it is tol wide (relative).
+# 'f' takes an array of values and returns the residual of each.
+def find_root(f, lo, hi, tol=1e-13, max_rounds=50):
+    for _ in range(max_rounds):
+        x = np.linspace(lo, hi, grid_points)
+        y = f(x)
+        zero = np.flatnonzero(y == 0)
+        if zero.size:
+            return float(x[zero[0]])
+        change = np.flatnonzero(np.sign(y[:-1]) * np.sign(y[1:]) < 0)
+        if not change.size:
+            raise ValueError('No solution between %g and %g (pass another bracket)' % (lo, hi))
+        k = change[0]
+        lo, hi = x[k], x[k + 1]
+        if hi - lo <= tol * max(abs(lo), abs(hi), 1.0):
+            break
+    # Linear interpolation within the final cell
+    return float(lo - y[k] * (hi - lo) / (y[k + 1] - y[k]))
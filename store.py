@@ -0,0 +1,140 @@
+# Purpose: Read and write the escalated inputs and the LCOE results, either
+# as csv files (compatibility mode) or as typed Parquet datasets.
+#
+# Parquet datasets are partitioned by case (if any) and generation, so that
+# downstream tools can read only the partitions and columns they need. The
+# schema carries the units of every column and the year parameters.
+# Parquet output needs pyarrow, which is optional and only imported by the
+# Parquet functions, so csv runs do not pay for it.
+
+import os
+import shutil
+import pandas as pd
+from instrument import stage
+
+
+# Output formats
+formats = ['csv', 'parquet']
+
+# Columns which become partition directories of Parquet datasets
+partition_cols = ['case', 'name']
+
+
+# The pyarrow and pyarrow.parquet modules, imported on first use
+def require_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError('Parquet output needs pyarrow (pip install pyarrow)')
+    return pa, pq
+
+
+# Units of the columns of the LCOE results
+def result_units(general_inputs):
+    lcoe_unit = general_inputs.get('lcoe unit', 'cents/kWh')
+    units = {col: lcoe_unit for col in
+             ['Capital', 'Fixed O&M', 'Variable O&M', 'Fuel', 'Carbon', 'Methane',
+              'Transmission', 'Non-GHG External Costs', 'LCOE base',
+              'GHG External Costs', 'LCOE w/ Total Social Costs']}
+    units['Online year']   = 'year'
+    units['Effective SCC'] = '$/t CO2'
+    units['Effective SCM'] = '$/t CH4'
+    return units
+
+
+# Schema metadata: the LCOE unit and the year parameters. Escalation and
+# discounting use start_yr as the base year.
+def schema_metadata(general_inputs):
+    return {'lcoe_unit':   str(general_inputs.get('lcoe unit', '')),
+            'base_year':   str(general_inputs['start_yr']),
+            'period_0_yr': str(general_inputs['period_0_yr']),
+            'start_yr':    str(general_inputs['start_yr']),
+            'end_yr':      str(general_inputs['end_yr'])}
+
+
+# Arrow table of a data frame with explicit types: strings for the
+# case and generation names, 16-bit integers for years and float64
+# for everything else. 'units' maps columns to their unit.
+def to_table(frame, metadata=None, units=None):
+    pa, _ = require_pyarrow()
+    units  = units or {}
+    fields = []
+    for col in frame.columns:
+        if col in partition_cols:
+            typ = pa.string()
+        elif col in ('year', 'scenario', 'Online year'):
+            typ = pa.int32() if col == 'scenario' else pa.int16()
+        else:
+            typ = pa.float64()
+        meta = {'unit': units[col]} if col in units else None
+        fields.append(pa.field(col, typ, metadata=meta))
+    schema = pa.schema(fields, metadata=metadata)
+    return pa.Table.from_pandas(frame, schema=schema, preserve_index=False)
+
+
+# Write a data frame as csv (one file, as the scripts always did) or as a
+# Parquet dataset directory partitioned by case and generation. Writing a
+# partition again replaces it, so the results of a case can be streamed
+# into the dataset one case at a time.
+def write_frame(frame, path, format='csv', metadata=None, units=None):
+    if format not in formats:
+        raise ValueError('Unknown output format: %r' % (format,))
+    with stage('write_' + format) as span:
+        span.record(frame)
+        if format == 'csv':
+            frame.to_csv(path)
+            return
+        _, pq = require_pyarrow()
+        table = to_table(frame, metadata, units)
+        os.makedirs(path, exist_ok=True)
+        pq.write_to_dataset(table, path,
+                            partition_cols=[c for c in partition_cols if c in frame],
+                            basename_template='part-{i}.parquet',
+                            existing_data_behavior='delete_matching')
+        # Full schema (with the partition columns) for readers of the dataset
+        pq.write_metadata(table.schema, os.path.join(path, '_common_metadata'))
+
+
+# Write the LCOE results (same columns as all_lcoe_results.csv,
+# optionally with a 'case' column)
+def write_results(output, path, format='csv', general_inputs=None):
+    metadata = units = None
+    if general_inputs is not None:
+        metadata, units = schema_metadata(general_inputs), result_units(general_inputs)
+    write_frame(output, path, format, metadata, units)
+
+
+# Write the escalated inputs (rawdata_esc)
+def write_inputs(inputs, path, format='csv'):
+    write_frame(inputs.data, path, format, schema_metadata(inputs.general_inputs))
+
+
+# Remove the output of a previous run
+def clear_output(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+# Read results or inputs written by write_frame(). For Parquet datasets only
+# the given 'columns' are read, and 'filters' (pyarrow filters, e.g.
+# [('name', '=', 'nuclear')]) select partitions without reading the others.
+def read_frame(path, columns=None, filters=None):
+    if not os.path.isdir(path):
+        frame = pd.read_csv(path, index_col=0)
+        return frame if columns is None else frame[columns]
+    _, pq = require_pyarrow()
+    return pq.read_table(path, columns=columns, filters=filters).to_pandas()
+
+
+# Schema metadata and column units of a Parquet dataset
+def read_metadata(path):
+    _, pq = require_pyarrow()
+    schema = pq.read_schema(os.path.join(path, '_common_metadata'))
+    metadata = {k.decode(): v.decode() for k, v in (schema.metadata or {}).items()
+                if not k.startswith(b'pandas')}
+    units = {field.name: field.metadata[b'unit'].decode() for field in schema
+             if field.metadata and b'unit' in field.metadata}
+    return metadata, units
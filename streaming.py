@@ -0,0 +1,361 @@
+# Purpose: Probabilistic LCOE runs over any number of scenarios with
+# bounded memory.
+#
+# Scenarios are pulled in fixed-size chunks, either drawn from a sampler or
+# read from a csv/Parquet file, and each chunk goes through escalation and
+# the LCOE formulas of batch.py. The results of a chunk are appended to the
+# output file and/or folded into running aggregates (count, mean, variance,
+# min, max and optional histograms per generation and result column), then
+# dropped. Only one chunk is held at a time, so peak memory does not grow
+# with the number of scenarios.
+#
+# The aggregates are mergeable: the histograms use fixed bins (by default
+# log-spaced bins of ~1% relative width on both sides of 0, which need no
+# range up front), so the aggregates of parallel workers or separate runs
+# merge exactly into the aggregate of all their scenarios, and P5/P50/P95
+# come from the merged histograms without keeping any sample.
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from batch import evaluate, lcoe_cols, prepare
+from model import load_model
+from load_inputs import default_input_dir
+from store import clear_output, formats, require_pyarrow, result_units, schema_metadata, to_table
+
+
+# Scenarios per chunk
+default_chunk_size = 10000
+
+# Relative width of the default histogram bins, and the smallest and
+# largest magnitude they resolve (results in cents/kWh, $/t, ...)
+default_accuracy = 0.01
+bin_range = (1e-6, 1e6)
+
+
+################# SCENARIO SOURCES ##################
+
+# Draw 'n' scenarios from 'distributions', 'chunk_size' at a time.
+# 'distributions' maps scenario columns (see batch.py) to (kind, *args)
+# where kind is a numpy Generator method, e.g.
+#   {'wacc': ('uniform', 5, 8), 'nuclear:on_c': ('normal', 6160, 600)}
+# Yields data frames of at most chunk_size rows.
+def sample_scenarios(distributions, n, chunk_size=default_chunk_size, seed=0):
+    rng = np.random.default_rng(seed)
+    for lo in range(0, n, chunk_size):
+        size = min(chunk_size, n - lo)
+        yield pd.DataFrame({col: getattr(rng, kind)(*args, size=size)
+                            for col, (kind, *args) in distributions.items()})
+
+
+# Read scenarios from a csv file, a Parquet file or a Parquet dataset
+# directory (e.g. written by store.py), at most 'chunk_size' rows at a time
+def read_scenarios(path, chunk_size=default_chunk_size):
+    if os.path.isdir(path):
+        require_pyarrow()
+        import pyarrow.dataset as ds
+        for batch in ds.dataset(path, format='parquet', partitioning='hive').to_batches(
+                batch_size=chunk_size):
+            if batch.num_rows:
+                yield batch.to_pandas()
+    elif path.endswith('.parquet'):
+        _, pq = require_pyarrow()
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size)
+
+
+################### STREAMING ######################
+
+# Evaluate every chunk of scenarios. Yields (offset, results) where offset
+# is the number of scenarios before the chunk and results is the dictionary
+# of (scenario, generation) arrays returned by batch.evaluate().
+def stream_results(model, chunks):
+    offset = 0
+    for chunk in chunks:
+        results = evaluate(model, chunk, chunk_size=len(chunk) or 1)
+        yield offset, results
+        offset += len(chunk)
+
+
+# Results of one chunk as a data frame laid out like compute_lcoe_batch()
+def results_frame(model, results, offset=0):
+    n, k = results['Capital'].shape
+    frame = pd.DataFrame({'scenario': np.repeat(np.arange(offset, offset + n), k),
+                          'name': np.tile(model.names, n),
+                          'Online year': model.general_inputs['period_0_yr'] + 1})
+    for col in lcoe_cols:
+        frame[col] = results[col].ravel()
+    return frame
+
+
+# Appends the results of each chunk to one csv file or one Parquet file
+class ChunkWriter:
+    def __init__(self, path, format='csv', general_inputs=None):
+        if format not in formats:
+            raise ValueError('Unknown output format: %r' % (format,))
+        if format == 'parquet':
+            require_pyarrow()
+        clear_output(path)
+        self.path   = path
+        self.format = format
+        self.general_inputs = general_inputs
+        self.writer = None
+
+    def write(self, frame):
+        if self.format == 'csv':
+            frame.to_csv(self.path, mode='a', index=False,
+                         header=not os.path.exists(self.path))
+            return
+        metadata = units = None
+        if self.general_inputs is not None:
+            metadata = schema_metadata(self.general_inputs)
+            units    = result_units(self.general_inputs)
+        table = to_table(frame, metadata, units)
+        if self.writer is None:
+            _, pq = require_pyarrow()
+            self.writer = pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+################# RUNNING AGGREGATES #################
+
+# Fixed histogram bin edges: log-spaced magnitudes from bin_range[0] to
+# bin_range[1], each bin 'accuracy' wide relative to its edges, mirrored
+# for negative values, with one bin (-bin_range[0], bin_range[0]) around 0.
+# Any two histograms with these bins merge exactly.
+def log_bins(accuracy=default_accuracy, lo=bin_range[0], hi=bin_range[1]):
+    n = int(np.ceil(np.log(hi / lo) / np.log1p(accuracy))) + 1
+    edges = np.geomspace(lo, hi, n)
+    return np.concatenate([-edges[::-1], edges])
+
+
+# Running count, mean, variance, min and max of every result column of every
+# generation, and a histogram of each over fixed 'bins' (default log_bins();
+# values outside the edges are counted in the first and last bin). Updated
+# one chunk at a time with add(); aggregates with the same bins are combined
+# with merge().
+class Aggregate:
+    def __init__(self, names, cols=lcoe_cols, bins=None):
+        self.names = list(names)
+        self.cols  = list(cols)
+        self.bins  = log_bins() if bins is None else np.asarray(bins, dtype=float)
+        shape = (len(self.cols), len(self.names))
+        self.count = 0
+        self.mean  = np.zeros(shape)
+        self.m2    = np.zeros(shape)     # sum of squared deviations from the mean
+        self.min   = np.full(shape, np.inf)
+        self.max   = np.full(shape, -np.inf)
+        self.hist  = np.zeros(shape + (len(self.bins) - 1,), dtype=np.int64)
+
+    # Fold the results of one chunk ({col: (scenario, generation) array}) in
+    def add(self, results):
+        values = np.stack([results[col] for col in self.cols])     # (col, scenario, gen)
+        n = values.shape[1]
+        if n == 0:
+            return
+        mean = values.mean(axis=1)
+        m2   = ((values - mean[:, None, :]) ** 2).sum(axis=1)
+        self.combine(n, mean, m2, values.min(axis=1), values.max(axis=1))
+
+        nbins = len(self.bins) - 1
+        index = np.clip(np.searchsorted(self.bins, values, side='right') - 1, 0, nbins - 1)
+        # One bincount over (col, gen, bin) cells
+        cell  = (np.arange(len(self.cols))[:, None, None] * len(self.names) +
+                 np.arange(len(self.names))[None, None, :]) * nbins + index
+        self.hist += np.bincount(cell.ravel(), minlength=self.hist.size).reshape(self.hist.shape)
+
+    # Combine the moments with those of n other values (Chan et al.)
+    def combine(self, n, mean, m2, min, max):
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean  = self.mean + delta * n / total
+        self.m2    = self.m2 + m2 + delta ** 2 * self.count * n / total
+        self.count = total
+        self.min   = np.minimum(self.min, min)
+        self.max   = np.maximum(self.max, max)
+
+    # Merge the aggregate of other scenarios into this one
+    def merge(self, other):
+        if (other.names != self.names or other.cols != self.cols or
+                not np.array_equal(other.bins, self.bins)):
+            raise ValueError('Only aggregates of the same generations, columns and bins merge')
+        if other.count:
+            self.combine(other.count, other.mean, other.m2, other.min, other.max)
+            self.hist += other.hist
+        return self
+
+    @property
+    def var(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else np.full_like(self.m2, np.nan)
+
+    # Quantile q (0..1) of every column of every generation, interpolated
+    # within the histogram bins and clipped to the min and max
+    def quantile(self, q):
+        cum    = np.cumsum(self.hist, axis=-1)
+        rank   = q * self.count
+        k      = np.minimum((cum < rank).sum(axis=-1), self.hist.shape[-1] - 1)[..., None]
+        inside = np.take_along_axis(self.hist, k, -1)[..., 0]
+        before = np.take_along_axis(cum, k, -1)[..., 0] - inside
+        k      = k[..., 0]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            frac = np.where(inside > 0, (rank - before) / inside, 0)
+        value = self.bins[k] + frac * (self.bins[k + 1] - self.bins[k])
+        return np.clip(value, self.min, self.max)
+
+    # Summary as a data frame with one row per generation and statistic
+    def to_frame(self, quantiles=(0.05, 0.5, 0.95)):
+        stats = {'mean': self.mean, 'var': self.var, 'std': np.sqrt(self.var),
+                 'min': self.min, 'max': self.max}
+        for q in quantiles:
+            stats['p%g' % (100 * q)] = self.quantile(q)
+        frames = []
+        for stat, values in stats.items():
+            frame = pd.DataFrame(values.T, columns=self.cols)
+            frame.insert(0, 'name', self.names)
+            frame.insert(1, 'stat', stat)
+            frames.append(frame)
+        output = pd.concat(frames, ignore_index=True)
+        output.insert(2, 'count', self.count)
+        return output.sort_values(['name', 'stat'], kind='stable').reset_index(drop=True)
+
+    # Save the aggregate (to merge it with others later)
+    def save(self, path):
+        np.savez_compressed(path, names=np.array(self.names, dtype=str),
+                            cols=np.array(self.cols, dtype=str), bins=self.bins,
+                            count=self.count, mean=self.mean, m2=self.m2,
+                            min=self.min, max=self.max, hist=self.hist)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as f:
+            aggregate = cls(f['names'].tolist(), f['cols'].tolist(), f['bins'])
+            aggregate.count = int(f['count'])
+            for k in ['mean', 'm2', 'min', 'max', 'hist']:
+                setattr(aggregate, k, f[k])
+        return aggregate
+
+
+# Run the LCOE calculation over every chunk of scenarios. The results of each
+# chunk are appended to 'output' (if given) and folded into the running
+# aggregates, which are returned. 'inputs' is the Inputs returned by
+# load_inputs() or a Model.
+def run_stream(inputs, chunks, output=None, format='csv', bins=None):
+    model = prepare(inputs)
+    aggregate = Aggregate(model.names, bins=bins)
+    writer = ChunkWriter(output, format, model.general_inputs) if output else None
+    try:
+        for offset, results in stream_results(model, chunks):
+            aggregate.add(results)
+            if writer is not None:
+                writer.write(results_frame(model, results, offset))
+    finally:
+        if writer is not None:
+            writer.close()
+    return aggregate
+
+
+# Aggregate of n scenarios drawn from 'distributions'. Runs in a worker process.
+def sample_aggregate(model, distributions, n, chunk_size, seed, bins):
+    return run_stream(model, sample_scenarios(distributions, n, chunk_size, seed), bins=bins)
+
+
+# Sample n scenarios from 'distributions' on 'workers' processes (each with
+# its own random stream and its share of the scenarios) and merge their
+# aggregates. The merged aggregate does not depend on the order in which
+# the workers finish.
+def run_sampled(inputs, distributions, n, workers=None, chunk_size=default_chunk_size,
+                seed=0, bins=None):
+    model   = prepare(inputs)
+    workers = workers or os.cpu_count() or 1
+    seeds   = np.random.SeedSequence(seed).spawn(workers)
+    shares  = [n // workers + (i < n % workers) for i in range(workers)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parts = list(pool.map(sample_aggregate, [model] * workers, [distributions] * workers,
+                              shares, [chunk_size] * workers, seeds, [bins] * workers))
+    aggregate = Aggregate(model.names, bins=parts[0].bins)
+    for part in parts:
+        aggregate.merge(part)
+    return aggregate
+
+
+# Parse a distribution given as 'param=kind:arg:arg...', e.g. 'wacc=uniform:5:8'
+def parse_distribution(spec):
+    col, _, dist = spec.rpartition('=')
+    kind, *args = dist.split(':')
+    if not col or not args:
+        raise argparse.ArgumentTypeError('Expected param=kind:arg:...: %r' % (spec,))
+    return col, (kind, *map(float, args))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the LCOE calculation over many scenarios in chunks.')
+    parser.add_argument('--inputs', default=default_input_dir, help='input directory')
+    parser.add_argument('--scenarios', default=None,
+                        help='csv or Parquet file, or Parquet dataset directory, of scenarios (one column per input)')
+    parser.add_argument('--samples', type=int, default=0,
+                        help='number of scenarios to sample from the --dist distributions')
+    parser.add_argument('--dist', type=parse_distribution, action='append', default=[],
+                        help="distribution of one input, e.g. 'wacc=uniform:5:8' or "
+                             "'nuclear:on_c=normal:6160:600' (numpy Generator methods)")
+    parser.add_argument('--seed', type=int, default=0, help='seed of the sampler')
+    parser.add_argument('--chunk-size', type=int, default=default_chunk_size,
+                        help='scenarios per chunk (default: %(default)s)')
+    parser.add_argument('-o', '--output', default=None,
+                        help='write the results of every scenario to this file')
+    parser.add_argument('--format', choices=formats, default='csv',
+                        help='format of --output (default: %(default)s)')
+    parser.add_argument('--bins', type=float, nargs=3, metavar=('LO', 'HI', 'N'), default=None,
+                        help='histograms with N equal bins between LO and HI instead of '
+                             'log-spaced bins')
+    parser.add_argument('--accuracy', type=float, default=default_accuracy,
+                        help='relative width of the log-spaced bins (default: %(default)s)')
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help='processes sampling scenarios in parallel, for sampled runs '
+                             'without --output (default: %(default)s)')
+    parser.add_argument('--save', default=None,
+                        help='save the aggregates to this .npz file (to merge them later)')
+    parser.add_argument('--merge', nargs='+', default=None,
+                        help='merge the aggregates saved by earlier runs instead of running')
+    parser.add_argument('--summary', default='lcoe_summary.csv',
+                        help='csv file of the aggregates (default: %(default)s)')
+    args = parser.parse_args()
+
+    if args.bins is None:
+        bins = log_bins(args.accuracy)
+    else:
+        bins = np.linspace(args.bins[0], args.bins[1], int(args.bins[2]) + 1)
+
+    if args.merge:
+        aggregate = Aggregate.load(args.merge[0])
+        for path in args.merge[1:]:
+            aggregate.merge(Aggregate.load(path))
+    elif args.workers != 1 and not args.scenarios and not args.output:
+        aggregate = run_sampled(load_model(args.inputs), dict(args.dist), args.samples,
+                                args.workers, args.chunk_size, args.seed, bins)
+    else:
+        if args.scenarios:
+            chunks = read_scenarios(args.scenarios, args.chunk_size)
+        else:
+            chunks = sample_scenarios(dict(args.dist), args.samples, args.chunk_size, args.seed)
+        aggregate = run_stream(load_model(args.inputs), chunks, args.output, args.format, bins)
+
+    if args.save:
+        aggregate.save(args.save)
+    aggregate.to_frame().to_csv(args.summary, index=False)
+    print('%d scenarios summarized in %s' % (aggregate.count, args.summary))
@@ -0,0 +1,43 @@
+# Purpose: Shared fixtures of the tests: the repository modules on the path,
+# the shipped inputs and results, and editable copies of the inputs.
+
+import os
+import shutil
+import sys
+import pandas as pd
+import pytest
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+
+input_dir  = os.path.join(root, 'csv_inputs')
+golden_csv = os.path.join(root, 'csv_outputs', 'all_lcoe_results.csv')
+
+
+# all_lcoe_results.csv as shipped
+@pytest.fixture(scope='session')
+def golden():
+    return pd.read_csv(golden_csv, index_col=0)
+
+
+# Compact model of csv_inputs
+@pytest.fixture(scope='session')
+def model():
+    from model import load_model
+    return load_model(input_dir)
+
+
+# Copy of csv_inputs the test can edit
+@pytest.fixture
+def inputs(tmp_path):
+    path = str(tmp_path / 'inputs')
+    shutil.copytree(input_dir, path)
+    return path
+
+
+# Set the input 'param' of generation 'name' to 'value' in the directory 'path'
+def edit_input(path, name, param, value):
+    file = os.path.join(path, name + '.csv')
+    data = pd.read_csv(file)
+    data[param] = value
+    data.to_csv(file, index=False)
@@ -0,0 +1,68 @@
+# Purpose: Tests of the mergeable running aggregates (streaming.Aggregate).
+
+import numpy as np
+import pytest
+from batch import lcoe_cols
+from streaming import Aggregate, sample_scenarios, parse_distribution, stream_results, run_sampled
+
+
+distributions = dict(parse_distribution(spec) for spec in
+                     ['wacc=uniform:5:8', 'nuclear:on_c=normal:6160:600'])
+
+
+def aggregate(model, chunks):
+    result = Aggregate(model.names)
+    for _, results in stream_results(model, chunks):
+        result.add(results)
+    return result
+
+
+# The aggregates of two halves of the scenarios merge into the aggregate of all
+def test_merge(model, tmp_path):
+    chunks = list(sample_scenarios(distributions, 1000, chunk_size=250, seed=1))
+    whole  = aggregate(model, chunks)
+    merged = aggregate(model, chunks[:2])
+    path = str(tmp_path / 'half.npz')
+    aggregate(model, chunks[2:]).save(path)
+    merged.merge(Aggregate.load(path))
+
+    assert merged.count == whole.count == 1000
+    np.testing.assert_array_equal(merged.hist, whole.hist)
+    np.testing.assert_array_equal(merged.min, whole.min)
+    np.testing.assert_array_equal(merged.max, whole.max)
+    np.testing.assert_allclose(merged.mean, whole.mean, rtol=1e-12)
+    np.testing.assert_allclose(merged.var, whole.var, rtol=1e-9, atol=1e-20)
+    np.testing.assert_array_equal(merged.quantile(0.5), whole.quantile(0.5))
+
+
+def test_merge_other_bins(model):
+    other = Aggregate(model.names, bins=np.linspace(0, 100, 11))
+    with pytest.raises(ValueError):
+        Aggregate(model.names).merge(other)
+
+
+# Moments are those of all results; quantiles are within the bin accuracy
+def test_accuracy(model):
+    chunks = list(sample_scenarios(distributions, 2000, chunk_size=500, seed=3))
+    result = aggregate(model, chunks)
+    values = np.concatenate([np.stack([results[col] for col in lcoe_cols], axis=1)
+                             for _, results in stream_results(model, chunks)])   # (scenario, col, gen)
+
+    np.testing.assert_allclose(result.mean, values.mean(axis=0), rtol=1e-12)
+    np.testing.assert_allclose(result.var, values.var(axis=0, ddof=1), rtol=1e-8, atol=1e-20)
+    np.testing.assert_array_equal(result.min, values.min(axis=0))
+    np.testing.assert_array_equal(result.max, values.max(axis=0))
+    for q in [0.05, 0.5, 0.95]:
+        exact = np.quantile(values, q, axis=0)
+        np.testing.assert_allclose(result.quantile(q), exact, rtol=0.011, atol=1e-12)
+
+
+# Parallel workers give the aggregate of the same scenarios in one process
+def test_workers(model):
+    parts  = run_sampled(model, distributions, 600, workers=2, chunk_size=100, seed=4)
+    seeds  = np.random.SeedSequence(4).spawn(2)
+    whole  = aggregate(model, [chunk for seed in seeds for chunk in
+                               sample_scenarios(distributions, 300, chunk_size=100, seed=seed)])
+    assert parts.count == whole.count == 600
+    np.testing.assert_array_equal(parts.hist, whole.hist)
+    np.testing.assert_allclose(parts.mean, whole.mean, rtol=1e-12)
@@ -0,0 +1,78 @@
+# Purpose: Tests of the batch engine (batch.py): the results of lcoe_calc.py
+# on every horizon, scenarios and the rule of input overrides.
+
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import edit_input
+from test_golden import check_results
+from load_inputs import load_inputs
+from lcoe_calc import compute_lcoe
+from model import load_model
+from batch import evaluate, compute_lcoe_batch, lcoe_cols
+
+
+def results(model, scenarios=None):
+    return compute_lcoe_batch(model, scenarios)[lcoe_cols].to_numpy()
+
+
+def test_golden(model, golden):
+    output = compute_lcoe_batch(model)
+    assert (output['scenario'] == 0).all()
+    check_results(output.drop(columns='scenario'), golden)
+
+
+# Both engines agree when the schedule files reach past end_yr
+@pytest.mark.parametrize('end_yr', [2040, 2045])
+def test_horizon(inputs, end_yr):
+    edit_input(inputs, 'general', 'end_yr', end_yr)
+    expected = compute_lcoe(load_inputs(inputs))
+    check_results(compute_lcoe_batch(load_model(inputs)).drop(columns='scenario'), expected)
+
+
+# Every scenario of a batch equals the run of its inputs alone
+def test_scenarios(model):
+    scenarios = pd.DataFrame({'wacc': [5.0, 7.0], 'nuclear:on_c': [6000.0, 8000.0]})
+    output = compute_lcoe_batch(model, scenarios, chunk_size=1)
+    for i in scenarios.index:
+        alone = compute_lcoe_batch(model, scenarios.iloc[[i]])
+        np.testing.assert_allclose(output[output['scenario'] == i][lcoe_cols].to_numpy(),
+                                   alone[lcoe_cols].to_numpy(), rtol=1e-13)
+
+
+# An override of a renewable acts like an edit of its csv file, which also
+# changes the hybrid built from it
+@pytest.mark.parametrize('param, value', [('on_c', 1500.0), ('cap_fac', 25.0)])
+def test_renewable_override(model, inputs, param, value):
+    edit_input(inputs, 'solar', param, value)
+    expected = results(load_model(inputs))
+    output   = results(model, pd.DataFrame({'solar:' + param: [value]}))
+    np.testing.assert_allclose(output, expected, rtol=1e-12, atol=1e-12)
+
+
+# An override of a hybrid takes precedence over the one of its renewable
+def test_hybrid_override(model):
+    solar, hybrid = model.sources.index('solar'), model.names.index('solar_hybrid')
+    base   = evaluate(model)
+    output = evaluate(model, {'solar:cap_fac': [25.0],
+                              'solar_hybrid:cap_fac': [model.params['cap_fac'][solar]]})
+    for col in lcoe_cols:
+        assert output[col][0, hybrid] == pytest.approx(base[col][0, hybrid], rel=1e-13)
+    assert output['LCOE base'][0, solar] != base['LCOE base'][0, solar]
+
+
+# An override of gas (advanced ct) changes the backup of every hybrid
+def test_backup_override(model, inputs):
+    edit_input(inputs, 'gas (advanced ct)', 'on_c', 1500.0)
+    expected = results(load_model(inputs))
+    output   = results(model, pd.DataFrame({'gas (advanced ct):on_c': [1500.0]}))
+    np.testing.assert_allclose(output, expected, rtol=1e-12, atol=1e-12)
+    hybrids = [i for i, name in enumerate(model.names) if 'hybrid' in name]
+    assert (output[hybrids] != results(model)[hybrids]).any(axis=1).all()
+
+
+# Hybrid inputs come from the *_aux.csv files, so an override of them on
+# a renewable changes nothing, as an edit of its csv file would not
+def test_hybrid_param_override(model):
+    output = results(model, pd.DataFrame({'hydro:equiv_cap': [0.0], 'hydro:hybrid_wacc': [9.0]}))
+    np.testing.assert_array_equal(output, results(model))
@@ -0,0 +1,59 @@
+# Purpose: Tests of the parsed-input cache (cache.py).
+
+import numpy as np
+import cache
+from conftest import edit_input
+from load_inputs import load_inputs, source
+from lcoe_calc import compute_lcoe
+from batch import lcoe_cols
+
+
+# Names of the cache entries written while calling f()
+def rebuilt(monkeypatch, f):
+    names = []
+    write_entry = cache.write_entry
+    def record(cache_dir, name, key, data):
+        names.append(name)
+        write_entry(cache_dir, name, key, data)
+    monkeypatch.setattr(cache, 'write_entry', record)
+    result = f()
+    monkeypatch.setattr(cache, 'write_entry', write_entry)
+    return result, names
+
+
+def test_cache_invalidation(inputs, tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / 'cache')
+    _, names = rebuilt(monkeypatch, lambda: load_inputs(inputs, cache_dir=cache_dir))
+    assert sorted(names) == sorted(source)
+    _, names = rebuilt(monkeypatch, lambda: load_inputs(inputs, cache_dir=cache_dir))
+    assert names == []
+
+    # Editing solar.csv rebuilds solar and the hybrid built from it
+    edit_input(inputs, 'solar', 'cap_fac', 25)
+    cached, names = rebuilt(monkeypatch, lambda: load_inputs(inputs, cache_dir=cache_dir))
+    assert sorted(names) == ['solar', 'solar_hybrid']
+    expected = compute_lcoe(load_inputs(inputs))
+    output   = compute_lcoe(cached)
+    np.testing.assert_array_equal(output[lcoe_cols].to_numpy(), expected[lcoe_cols].to_numpy())
+
+
+# The year parameters are part of every key
+def test_cache_years(inputs, tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / 'cache')
+    load_inputs(inputs, cache_dir=cache_dir)
+    edit_input(inputs, 'general', 'end_yr', 2045)
+    cached, names = rebuilt(monkeypatch, lambda: load_inputs(inputs, cache_dir=cache_dir))
+    assert sorted(names) == sorted(source)
+    assert cached.data['year'].max() == 2045
+
+
+# A damaged entry is rebuilt instead of read
+def test_cache_damaged_entry(inputs, tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / 'cache')
+    expected  = compute_lcoe(load_inputs(inputs, cache_dir=cache_dir))
+    with open(cache.entry_path(cache_dir, 'nuclear'), 'wb') as f:
+        f.write(b'not an npz file')
+    cached, names = rebuilt(monkeypatch, lambda: load_inputs(inputs, cache_dir=cache_dir))
+    assert names == ['nuclear']
+    np.testing.assert_array_equal(compute_lcoe(cached)[lcoe_cols].to_numpy(),
+                                  expected[lcoe_cols].to_numpy())
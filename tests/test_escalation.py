@@ -0,0 +1,54 @@
+# Purpose: Tests of the closed-form escalation and discount factors
+# (escalation.py) against the per-year loops they replaced.
+
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import edit_input
+from escalation import shift_yr, fl_shift_fls
+from load_inputs import load_general_inputs, load_rawdata, escalate, source
+
+
+# Escalation factors of one generation, year by year as load_inputs.py
+# computed them before escalation.py: {factor: {year: value}}
+def loop_factors(rawdata, general_inputs, source_name):
+    start_yr, end_yr = general_inputs['start_yr'], general_inputs['end_yr']
+    rows = rawdata[rawdata['name'] == source_name].set_index('year')
+    rates = {'inf': 1 + general_inputs['inf'] / 100.0,
+             'om':  (1 + general_inputs['inf'] / 100.0) * (1 + general_inputs['om_real'] / 100.0)}
+    if (rows['fuel_sched'] == 0).all():
+        rates['fl'] = (1 + general_inputs['inf'] / 100.0) * (1 + rows['fl_real'][start_yr] / 100.0)
+
+    esc = {}
+    for f in ['inf', 'om', 'fl']:
+        esc[f] = {}
+        if f == 'fl' and source_name.partition(' ')[0].lower() in fl_shift_fls:
+            base_price  = rows['fuel_sched'][start_yr]
+            shift_price = rows['fuel_sched'][shift_yr]
+            for yr in range(start_yr, end_yr + 1):
+                price = rows['fuel_sched'][yr] if yr <= shift_yr else shift_price
+                esc[f][yr] = (price * rates['inf'] ** (yr - start_yr) / base_price
+                              if base_price != 0 else 0)
+        else:
+            for yr in range(start_yr, end_yr + 1):
+                esc[f][yr] = rates[f] ** (yr - start_yr)
+
+    wacc = general_inputs['wacc'] / 100.0
+    if source_name.find('hybrid') != -1:
+        wacc = rows['hybrid_wacc'][general_inputs['period_0_yr']] / 100
+    esc['disc'] = {yr: 1 / (1 + wacc) ** (yr - start_yr) for yr in range(start_yr, end_yr + 1)}
+    return esc
+
+
+@pytest.mark.parametrize('general', [{}, {'om_real': 1.5, 'inf': 3, 'end_yr': 2045}])
+def test_loop_factors(inputs, general):
+    for k, v in general.items():
+        edit_input(inputs, 'general', k, v)
+    general_inputs = load_general_inputs(inputs)
+    rawdata = load_rawdata(inputs, general_inputs)
+    output  = escalate(rawdata, general_inputs)
+    for source_name in source:
+        esc  = pd.DataFrame(loop_factors(rawdata, general_inputs, source_name))
+        rows = output[output['name'] == source_name].set_index('year')
+        np.testing.assert_allclose(rows.loc[esc.index, esc.columns].to_numpy(dtype=float),
+                                   esc.to_numpy(), rtol=1e-13, err_msg=source_name)
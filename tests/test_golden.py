@@ -0,0 +1,19 @@
+# Purpose: Regression test against the shipped all_lcoe_results.csv.
+
+import numpy as np
+from conftest import input_dir
+from load_inputs import load_inputs
+from lcoe_calc import compute_lcoe
+from batch import lcoe_cols
+
+
+# Check 'output' against the results 'golden' (both like all_lcoe_results.csv)
+def check_results(output, golden, rtol=1e-12):
+    assert list(output['name']) == list(golden['name'])
+    assert list(output['Online year']) == list(golden['Online year'])
+    np.testing.assert_allclose(output[lcoe_cols].to_numpy(dtype=float),
+                               golden[lcoe_cols].to_numpy(dtype=float), rtol=rtol, atol=1e-12)
+
+
+def test_lcoe_calc(golden):
+    check_results(compute_lcoe(load_inputs(input_dir)), golden)
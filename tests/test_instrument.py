@@ -0,0 +1,55 @@
+# Purpose: Tests of the stage tracing (instrument.py).
+
+import json
+import pytest
+import instrument
+from conftest import input_dir
+from instrument import stage, tracing, null_span
+from load_inputs import load_inputs, source
+from lcoe_calc import compute_lcoe
+from batch import compute_lcoe_batch
+
+
+def test_json_trace(model, tmp_path):
+    path = str(tmp_path / 'trace.json')
+    with tracing(path):
+        compute_lcoe(load_inputs(input_dir))
+        compute_lcoe_batch(model)
+    with open(path) as f:
+        trace = json.load(f)
+    events = trace['events']
+    names  = [event['name'] for event in events]
+    for name in ['parse', 'clean', 'load_rawdata', 'escalate', 'attach_backup',
+                 'single_source_calc', 'hybrid_source_calc', 'lcoe_results', 'batch_chunk']:
+        assert name in names
+
+    # Parsing is traced per generation, inside load_rawdata
+    parse = [event for event in events if event['name'] == 'parse']
+    assert sorted(event['source'] for event in parse) == sorted(source)
+    assert all(event['parent'] == 'load_rawdata' and event['depth'] == 1 for event in parse)
+    for event in events:
+        assert event['duration'] >= 0 and event['peak_rss'] > 0
+    escalate = events[names.index('escalate')]
+    assert escalate['rows'] > 0 and escalate['cols'] > 0
+    assert trace['summary']['parse']['calls'] == len(source)
+
+
+def test_chrome_trace(tmp_path):
+    path = str(tmp_path / 'trace.json')
+    with tracing(path, 'chrome'):
+        with stage('outer'):
+            with pytest.raises(ZeroDivisionError):
+                with stage('inner', 'nuclear'):
+                    1 / 0
+    with open(path) as f:
+        events = json.load(f)['traceEvents']
+    assert [event['name'] for event in events] == ['inner: nuclear', 'outer']
+    assert all(event['ph'] == 'X' for event in events)
+    assert events[0]['args']['error'] == 'ZeroDivisionError'
+    assert events[1]['ts'] <= events[0]['ts'] and events[1]['dur'] >= events[0]['dur']
+
+
+def test_disabled():
+    assert instrument.recorder is None
+    assert stage('escalate') is null_span
+
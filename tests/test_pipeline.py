@@ -0,0 +1,41 @@
+# Purpose: Tests of the incremental runs of pipeline.py.
+
+import numpy as np
+from conftest import edit_input
+from load_inputs import load_inputs
+from lcoe_calc import compute_lcoe
+from pipeline import Pipeline
+from batch import lcoe_cols
+
+
+def test_pipeline(inputs, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    pipeline  = Pipeline(inputs, cache_dir=cache_dir)
+    computed  = []
+    compute   = pipeline.compute
+    pipeline.compute = lambda names: computed.append(list(names)) or compute(names)
+    first = pipeline.run()
+    assert computed == [pipeline.results_names()]
+
+    edit_input(inputs, 'nuclear', 'on_c', 7000)
+    output = pipeline.run()
+    assert computed[1:] == [['nuclear']]
+    expected = compute_lcoe(load_inputs(inputs))
+    np.testing.assert_allclose(output.set_index('name').loc[expected['name'], lcoe_cols].to_numpy(),
+                               expected[lcoe_cols].to_numpy(), rtol=1e-12)
+    changed = (output[lcoe_cols] != first[lcoe_cols]).any(axis=1)
+    assert list(output['name'][changed]) == ['nuclear']
+
+    # A new Pipeline on the same cache_dir starts from the last run
+    assert Pipeline(inputs, cache_dir=cache_dir).changed_sources()[0] == []
+
+
+# The hybrids depend on the backup source, and every row on general.csv
+def test_pipeline_dependencies(inputs, tmp_path):
+    pipeline = Pipeline(inputs, cache_dir=str(tmp_path / 'cache'))
+    pipeline.run()
+    edit_input(inputs, 'gas (advanced ct)', 'on_c', 1500)
+    names, _ = pipeline.changed_sources()
+    assert names == [name for name in pipeline.results_names() if 'hybrid' in name]
+    edit_input(inputs, 'general', 'wacc', 7)
+    assert pipeline.changed_sources()[0] == pipeline.results_names()
@@ -0,0 +1,36 @@
+# Purpose: Tests of the hybrid combinations of portfolio.py.
+
+import pytest
+from conftest import input_dir
+from load_inputs import load_inputs
+from lcoe_calc import single_source_calc
+from portfolio import combination_model, combination_name
+from batch import compute_lcoe_batch
+
+
+# A nuclear backup has the costs of nuclear as a single source (waste fee
+# and decommissioning included) for the output it runs at. With the general
+# tax and wacc for the hybrid, the costs of the combination are built from
+# the single-source sums of lcoe_calc.py.
+@pytest.mark.parametrize('level', [60, 85])
+def test_nuclear_backup(model, level):
+    inputs  = load_inputs(input_dir)
+    _, calc = single_source_calc(inputs.data.reset_index(drop=True), inputs.general_inputs,
+                                 inputs.sources, inputs.p0_yr, inputs.end_yr)
+    solar, nuclear = calc.loc['solar'], calc.loc['nuclear']
+
+    combos, info = combination_model(model, ['solar'], ['nuclear'], [level])
+    output = compute_lcoe_batch(combos).set_index('name')
+    row    = output.loc[combination_name('solar', 'nuclear', level)]
+
+    # Backup output relative to nuclear's own
+    p = {k: v[model.sources.index('nuclear')] for k, v in model.params.items()}
+    share = info['backup_cf_mean'][0] / (p['cap_fac'] / 100.0)
+    h_op  = solar['s_op'] + share * nuclear['s_op']
+    assert row['Capital'] == pytest.approx((solar['s_c'] + nuclear['s_c']) / h_op / 10, rel=1e-12)
+    assert row['Fixed O&M'] == pytest.approx((solar['s_om_f'] + nuclear['s_om_f']) / h_op / 10,
+                                             rel=1e-12)
+    assert row['Variable O&M'] == pytest.approx(
+        (solar['s_om_v'] + share * nuclear['s_om_v']) / h_op / 10, rel=1e-12)
+    assert row['Fuel'] == pytest.approx(share * nuclear['s_f'] / h_op / 10, rel=1e-12)
+    assert nuclear['s_w'] > 0
@@ -0,0 +1,49 @@
+# Purpose: Tests of the hourly profiles (profiles.py).
+
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import input_dir
+from test_golden import check_results
+from batch import compute_lcoe_batch, lcoe_cols
+from profiles import save_profile, load_profile_model
+
+
+# Flat profiles at the cap_fac of every generation that is not a hybrid
+def flat_profiles(model, profile_dir, dtype=None, years=1):
+    for i, name in enumerate(model.sources):
+        if not model.hybrid[i]:
+            hourly = np.full((years, 8760), model.params['cap_fac'][i] / 100.0)
+            save_profile(profile_dir, name, hourly, dtype=dtype)
+
+
+@pytest.mark.parametrize('years', [1, 3])
+def test_flat_profile(model, golden, tmp_path, years):
+    flat_profiles(model, str(tmp_path), years=years)
+    output = compute_lcoe_batch(load_profile_model(input_dir, str(tmp_path)))
+    check_results(output.drop(columns='scenario'), golden)
+
+
+# float32 profiles round the capacity factors only
+def test_float32_profile(model, golden, tmp_path):
+    flat_profiles(model, str(tmp_path), dtype=np.float32)
+    output = compute_lcoe_batch(load_profile_model(input_dir, str(tmp_path)))
+    check_results(output.drop(columns='scenario'), golden, rtol=1e-6)
+
+
+# A cap_fac override scales the profile (the backup dispatch of the hybrids
+# stays that of the inputs, so only single-source generations are compared)
+def test_profile_override(model, tmp_path):
+    flat_profiles(model, str(tmp_path))
+    scenarios = pd.DataFrame({'solar:cap_fac': [20.0, 30.0], 'wind:cap_fac': [30.0, 40.0]})
+    output   = compute_lcoe_batch(load_profile_model(input_dir, str(tmp_path)), scenarios)
+    expected = compute_lcoe_batch(model, scenarios)
+    hybrids  = [name for name, hybrid in zip(model.sources, model.hybrid) if hybrid]
+    single   = ~output['name'].isin(hybrids).to_numpy()
+    np.testing.assert_allclose(output[lcoe_cols].to_numpy()[single],
+                               expected[lcoe_cols].to_numpy()[single], rtol=1e-12, atol=1e-12)
+
+
+def test_no_profiles(tmp_path):
+    with pytest.raises(ValueError):
+        load_profile_model(input_dir, str(tmp_path))
@@ -0,0 +1,55 @@
+# Purpose: Tests of the runner over many input directories (runner.py).
+
+import os
+import shutil
+import subprocess
+import sys
+import pandas as pd
+import pytest
+from conftest import root, input_dir, edit_input
+from runner import expand_cases, case_ids, run_cases
+from batch import lcoe_cols
+
+
+# Cases east/base, east/high (nuclear on_c 8000) and west/base, and west/broken
+# without the inputs of nuclear
+@pytest.fixture
+def cases(tmp_path):
+    for case in ['east/base', 'east/high', 'west/base', 'west/broken']:
+        shutil.copytree(input_dir, str(tmp_path / case))
+    edit_input(str(tmp_path / 'east/high'), 'nuclear', 'on_c', 8000)
+    os.remove(str(tmp_path / 'west/broken' / 'nuclear.csv'))
+    return str(tmp_path)
+
+
+def test_case_ids(cases):
+    paths = expand_cases([os.path.join(cases, '*', '*')])
+    assert case_ids(paths) == ['east/base', 'east/high', 'west/base', 'west/broken']
+    with pytest.raises(ValueError):
+        case_ids(expand_cases([os.path.join(cases, 'none', '*')]))
+
+
+# A failing case is reported and the other cases are written
+@pytest.mark.parametrize('workers', [1, 2])
+def test_failing_case(cases, golden, workers):
+    output = os.path.join(cases, 'results.csv')
+    paths  = expand_cases([os.path.join(cases, '*', '*')])
+    results, errors = run_cases(paths, workers, output)
+    assert list(errors) == ['west/broken']
+    assert 'nuclear.csv' in errors['west/broken']
+
+    written = pd.read_csv(output)
+    for frame in [results, written]:
+        assert sorted(set(frame['case'])) == ['east/base', 'east/high', 'west/base']
+    base = results[results['case'] == 'west/base']
+    pd.testing.assert_frame_equal(base[lcoe_cols].reset_index(drop=True),
+                                  golden[lcoe_cols].reset_index(drop=True), rtol=1e-12)
+    high = results[results['case'] == 'east/high'].set_index('name')
+    assert high.loc['nuclear', 'Capital'] > golden.set_index('name').loc['nuclear', 'Capital']
+
+
+def test_no_cases(tmp_path):
+    run = subprocess.run([sys.executable, os.path.join(root, 'runner.py'),
+                          str(tmp_path / 'none' / '*')], capture_output=True, text=True)
+    assert run.returncode == 2
+    assert 'no case directories matched' in run.stderr
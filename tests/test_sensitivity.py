@@ -0,0 +1,47 @@
+# Purpose: Tests of the complex-step sensitivities (sensitivity.py).
+
+import numpy as np
+import pandas as pd
+import pytest
+from sensitivity import sensitivities, default_params, base_value
+from batch import evaluate, lcoe_cols
+
+
+@pytest.fixture(scope='module')
+def default(model):
+    return sensitivities(model).set_index(['param', 'name'])
+
+
+# Every input of the default run has the derivatives of a run of it alone
+def test_default_params(model, default):
+    params = default_params(model)
+    alone  = pd.concat([sensitivities(model, [param]) for param in params])
+    np.testing.assert_allclose(default.loc[list(zip(alone['param'], alone['name'])), lcoe_cols]
+                               .to_numpy(), alone[lcoe_cols].to_numpy(), rtol=1e-10, atol=1e-12)
+
+
+# Central differences with a relative step
+@pytest.mark.parametrize('param', ['wacc', 'tax', 'solar:cap_fac', 'solar:on_c', 'wind:cap',
+                                   'gas (advanced ct):on_c', 'nuclear:waste_fee',
+                                   'solar_hybrid:equiv_cap_fac', 'coal:fl_real'])
+def test_finite_differences(model, default, param):
+    x = base_value(model, param)
+    h = 1e-6 * max(abs(x), 1.0)
+    hi, lo = (evaluate(model, {param: [x + d]}) for d in (h, -h))
+    for col in lcoe_cols:
+        diff = (hi[col][0] - lo[col][0]) / (2 * h)
+        np.testing.assert_allclose(default.loc[param, col].loc[model.names].to_numpy(), diff,
+                                   rtol=1e-5, atol=1e-7 * np.abs(hi[col][0]).max(),
+                                   err_msg='%s by %s' % (col, param))
+
+
+def test_hybrid_by_renewable(default):
+    assert default.loc[('solar:cap_fac', 'solar_hybrid'), 'LCOE base'] < 0
+
+
+def test_elasticity(model):
+    output = sensitivities(model, ['solar:on_c'], elasticity=True).set_index('name')
+    deriv  = sensitivities(model, ['solar:on_c']).set_index('name')
+    base   = evaluate(model)['Capital'][0, model.names.index('solar')]
+    assert output.loc['solar', 'Capital'] == pytest.approx(
+        deriv.loc['solar', 'Capital'] * base_value(model, 'solar:on_c') / base, rel=1e-12)
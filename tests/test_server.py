@@ -0,0 +1,79 @@
+# Purpose: Tests of the LCOE service (server.py).
+
+import asyncio
+import json
+import numpy as np
+import pandas as pd
+import pytest
+import server
+from batch import compute_lcoe_batch, lcoe_cols
+
+
+def test_service_evaluate(model):
+    service = server.LcoeService(model)
+    rows = service.evaluate([{}, {'wacc': 5.0, 'nuclear:on_c': 7000.0}])
+    expected = compute_lcoe_batch(model, pd.DataFrame({'wacc': [model.general_inputs['wacc'], 5.0],
+                                                       'nuclear:on_c': [service.baseline['nuclear:on_c'], 7000.0]}))
+    output = pd.DataFrame([row for scenario in rows for row in scenario])
+    np.testing.assert_allclose(output[lcoe_cols].to_numpy(dtype=float),
+                               expected[lcoe_cols].to_numpy(), rtol=1e-13)
+    with pytest.raises(server.QueryError):
+        service.check({'no_such_input': 1})
+
+
+# The rows of a scenario do not depend on the scenarios batched with it
+def test_service_batch_independent(model):
+    service = server.LcoeService(model)
+    scenarios = [{'solar:cap_fac': 25.0}, {'solar_hybrid:cap_fac': 20.0}, {'wacc': 5.0}, {}]
+    mixed = service.evaluate(scenarios)
+    for scenario, rows in zip(scenarios, mixed):
+        alone = pd.DataFrame(service.evaluate([scenario])[0])
+        assert list(pd.DataFrame(rows)['name']) == list(alone['name'])
+        np.testing.assert_allclose(pd.DataFrame(rows)[lcoe_cols].to_numpy(dtype=float),
+                                   alone[lcoe_cols].to_numpy(dtype=float), rtol=1e-13)
+    alone = compute_lcoe_batch(model, pd.DataFrame({'solar:cap_fac': [25.0]}))
+    hybrid = next(row for row in mixed[0] if row['name'] == 'solar_hybrid')
+    assert hybrid['LCOE base'] == pytest.approx(
+        alone.set_index('name').loc['solar_hybrid', 'LCOE base'], rel=1e-13)
+
+
+# Writer of a connection, keeping what is written
+class Writer:
+    def __init__(self):
+        self.data = b''
+    def write(self, data):
+        self.data += data
+    async def drain(self):
+        pass
+    def close(self):
+        pass
+
+
+# Responses (status, payload) of the service to the HTTP requests 'requests'
+def serve(service, requests):
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(b''.join(requests))
+        reader.feed_eof()
+        writer = Writer()
+        await server.serve_connection(service, reader, writer)
+        return writer.data
+    data, responses = asyncio.run(run()), []
+    while data:
+        head, _, data = data.partition(b'\r\n\r\n')
+        length = int(head.split(b'Content-Length: ')[1].split(b'\r\n')[0])
+        responses.append((int(head.split(b' ')[1]), json.loads(data[:length])))
+        data = data[length:]
+    return responses
+
+
+# A failing evaluation is answered with 500 and the connection is kept
+def test_service_error(model):
+    service = server.LcoeService(model)
+    async def query(scenarios):
+        raise RuntimeError('boom')
+    service.query = query
+    get = b'GET /lcoe?wacc=5 HTTP/1.1\r\nHost: x\r\n\r\n'
+    responses = serve(service, [get, b'GET /health HTTP/1.1\r\nHost: x\r\n\r\n'])
+    assert responses[0] == (500, {'error': 'Internal error: boom'})
+    assert responses[1][0] == 200
@@ -0,0 +1,65 @@
+# Purpose: Tests of the model snapshot (snapshot.py) and the command line (lcoe.py).
+
+import os
+import subprocess
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import root, input_dir, edit_input
+from test_golden import check_results
+from batch import compute_lcoe_batch
+from lcoe import run
+from snapshot import input_key, save_snapshot, read_snapshot, load_snapshot
+
+
+def test_round_trip(model, golden, tmp_path):
+    path = str(tmp_path / 'model.npz')
+    save_snapshot(model, path, input_key(input_dir))
+    copy = read_snapshot(path, input_key(input_dir))
+    assert copy.general_inputs == model.general_inputs
+    assert (copy.names, copy.sources) == (model.names, model.sources)
+    for k, v in model.params.items():
+        np.testing.assert_array_equal(copy.params[k], v)
+    check_results(compute_lcoe_batch(copy).drop(columns='scenario'), golden)
+    assert read_snapshot(path, 'other key') is None
+
+
+# A snapshot is rebuilt when the inputs change
+def test_stale_snapshot(inputs, tmp_path):
+    path = str(tmp_path / 'model.npz')
+    base = load_snapshot(path, inputs)
+    assert os.path.exists(path)
+    edit_input(inputs, 'nuclear', 'on_c', 8000)
+    assert read_snapshot(path, input_key(inputs)) is None
+    model = load_snapshot(path, inputs)
+    i = model.sources.index('nuclear')
+    assert base.params['on_c'][i] != 8000
+    assert model.params['on_c'][i] == 8000
+    assert load_snapshot(path).params['on_c'][i] == 8000
+
+
+def test_missing_snapshot(tmp_path):
+    with pytest.raises(ValueError):
+        load_snapshot(str(tmp_path / 'none.npz'))
+
+
+# lcoe.run() gives the rows of all_lcoe_results.csv, for all or some generations
+@pytest.mark.parametrize('sources', [None, ['nuclear', 'solar_hybrid']])
+def test_run(golden, tmp_path, sources):
+    path = str(tmp_path / 'model.npz')
+    output = pd.DataFrame(run(input_dir, path, sources))
+    expected = golden if sources is None else golden[golden['name'].isin(sources)]
+    check_results(output, expected.reset_index(drop=True))
+    check_results(pd.DataFrame(run(snapshot=path, sources=sources)), output)
+
+
+# A run from the snapshot does not import pandas
+def test_numpy_only(model, tmp_path):
+    path = str(tmp_path / 'model.npz')
+    save_snapshot(model, path)
+    code = ('import sys, lcoe; lcoe.run(snapshot=%r); '
+            'print(sorted(m for m in ("pandas", "load_inputs") if m in sys.modules))' % path)
+    out = subprocess.run([sys.executable, '-c', code], cwd=root, capture_output=True,
+                         text=True, check=True).stdout
+    assert out.strip() == '[]'
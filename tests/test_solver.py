@@ -0,0 +1,57 @@
+# Purpose: Tests of the break-even queries (solver.py).
+
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import edit_input
+from model import load_model
+from batch import evaluate, compute_lcoe_batch, lcoe_cols
+from solver import Solver
+
+
+# The value found by a query gives the target (or parity) when evaluated
+@pytest.mark.parametrize('name, param, target', [
+    ('offshore wind', 'offshore wind:on_c', 8.0),     # linear, closed form
+    ('nuclear', 'wacc', 10.0),                        # root-finding
+])
+def test_target(model, name, param, target):
+    value = Solver(model).target(name, param, target)
+    output = evaluate(model, {param: [value]})['LCOE base']
+    assert output[0, model.names.index(name)] == pytest.approx(target, rel=1e-9)
+
+
+def test_parity(model):
+    column = 'LCOE w/ Total Social Costs'
+    value  = Solver(model).parity('coal with CCS', 'coal', 'coal:fl_c', column=column)
+    output = evaluate(model, {'coal:fl_c': [value]})[column]
+    i, j = model.names.index('coal with CCS'), model.names.index('coal')
+    assert output[0, i] == pytest.approx(output[0, j], rel=1e-9)
+
+
+def test_unknown_input(model):
+    with pytest.raises(ValueError):
+        Solver(model).target('nuclear', 'nuclear:no_such_input', 10.0)
+
+
+# Root-finding and the carbon price scale, which is not a scenario input
+def test_parity_carbon_scale(model):
+    column = 'LCOE w/ Total Social Costs'
+    solver = Solver(model)
+    value  = solver.parity('coal with CCS', 'coal', 'carbon_scale', column=column)
+    output = solver.results('carbon_scale', [value], column)
+    i, j = model.names.index('coal with CCS'), model.names.index('coal')
+    assert output[0, i] == pytest.approx(output[0, j], rel=1e-9)
+
+
+# For the fuels with the EIA projection fl_c scales the fuel price
+# schedule, and the fl_c of the csv file is not used
+def test_fuel_price_scale(model, inputs):
+    path  = os.path.join(inputs, 'coal_fuel_price_schedule.csv')
+    sched = pd.read_csv(path)
+    (sched * 1.5).to_csv(path, index=False)
+    edit_input(inputs, 'coal', 'fl_c', 1.0)
+    expected = compute_lcoe_batch(load_model(inputs))[lcoe_cols].to_numpy()
+    fl_c   = model.params['fl_c'][model.sources.index('coal')]
+    output = compute_lcoe_batch(model, pd.DataFrame({'coal:fl_c': [1.5 * fl_c]}))
+    np.testing.assert_allclose(output[lcoe_cols].to_numpy(), expected, rtol=1e-12)
@@ -0,0 +1,81 @@
+# Purpose: Tests of the csv and Parquet outputs (store.py).
+
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import input_dir
+from load_inputs import load_inputs
+from lcoe_calc import compute_lcoe
+from store import read_frame, read_metadata, write_inputs, write_results
+from batch import lcoe_cols
+
+pytest.importorskip('pyarrow')
+
+
+@pytest.fixture(scope='module')
+def inputs():
+    return load_inputs(input_dir)
+
+
+# Results of two cases: the shipped inputs and doubled capital costs
+@pytest.fixture(scope='module')
+def results(inputs):
+    output = compute_lcoe(inputs)
+    other  = output.copy()
+    other['Capital'] *= 2
+    output.insert(0, 'case', 'base')
+    other.insert(0, 'case', 'high')
+    return output, other
+
+
+def test_csv(results, inputs, tmp_path):
+    path = str(tmp_path / 'results.csv')
+    write_results(results[0], path, 'csv', inputs.general_inputs)
+    pd.testing.assert_frame_equal(read_frame(path), results[0])
+
+
+def test_parquet_results(results, inputs, tmp_path):
+    path = str(tmp_path / 'results')
+    for output in results:
+        write_results(output, path, 'parquet', inputs.general_inputs)
+    frame = read_frame(path).astype({'case': str, 'name': str})
+    frame = frame.sort_values(['case', 'name']).reset_index(drop=True)
+    expected = pd.concat(results).sort_values(['case', 'name']).reset_index(drop=True)
+    assert list(frame['case']) == list(expected['case'])
+    assert list(frame['name']) == list(expected['name'])
+    np.testing.assert_array_equal(frame[lcoe_cols].to_numpy(), expected[lcoe_cols].to_numpy())
+    assert frame['Online year'].dtype == np.int16
+
+    # Only the selected partitions and columns are read
+    nuclear = read_frame(path, columns=['case', 'name', 'Capital'],
+                         filters=[('name', '=', 'nuclear')])
+    assert list(nuclear.columns) == ['case', 'name', 'Capital']
+    assert sorted(nuclear['case']) == ['base', 'high']
+
+    metadata, units = read_metadata(path)
+    general = inputs.general_inputs
+    assert metadata['start_yr'] == str(general['start_yr'])
+    assert metadata['end_yr'] == str(general['end_yr'])
+    assert units['Capital'] == general['lcoe unit']
+    assert units['Effective SCC'] == '$/t CO2'
+
+
+# Writing a case again replaces its partition
+def test_parquet_rewrite(results, inputs, tmp_path):
+    path = str(tmp_path / 'results')
+    write_results(results[0], path, 'parquet', inputs.general_inputs)
+    write_results(results[1].assign(case='base'), path, 'parquet', inputs.general_inputs)
+    frame = read_frame(path).astype({'name': str}).set_index('name').loc[results[1]['name']]
+    np.testing.assert_array_equal(frame['Capital'].to_numpy(), results[1]['Capital'].to_numpy())
+
+
+def test_parquet_inputs(inputs, tmp_path):
+    path = str(tmp_path / 'rawdata_esc')
+    write_inputs(inputs, path, 'parquet')
+    frame = read_frame(path).astype({'name': str}).sort_values(['name', 'year'])
+    frame = frame.reset_index(drop=True)
+    data  = inputs.data.sort_values(['name', 'year']).reset_index(drop=True)
+    assert os.path.isdir(os.path.join(path, 'name=nuclear'))
+    np.testing.assert_array_equal(frame['year'].to_numpy(), data['year'].to_numpy())
+    np.testing.assert_allclose(frame['disc'].to_numpy(), data['disc'].to_numpy(dtype=float))
@@ -0,0 +1,56 @@
+# Purpose: Tests of the chunked scenario runs of streaming.py.
+
+import numpy as np
+import pandas as pd
+import pytest
+from store import write_frame
+from streaming import read_scenarios, run_stream
+from batch import compute_lcoe_batch, lcoe_cols
+
+
+# Scenarios of the chunk tests
+@pytest.fixture(scope='module')
+def scenarios():
+    rng = np.random.default_rng(2)
+    return pd.DataFrame({'wacc': rng.uniform(5, 8, 23),
+                         'solar:cap_fac': rng.uniform(20, 30, 23)})
+
+
+# Scenario files in every format read by read_scenarios()
+@pytest.mark.parametrize('format', ['csv', 'parquet file', 'parquet dataset'])
+def test_read_scenarios(scenarios, tmp_path, format):
+    if format == 'csv':
+        path = str(tmp_path / 'scenarios.csv')
+        scenarios.to_csv(path, index=False)
+    else:
+        pytest.importorskip('pyarrow')
+        if format == 'parquet file':
+            path = str(tmp_path / 'scenarios.parquet')
+            scenarios.to_parquet(path)
+        else:
+            path = str(tmp_path / 'scenarios')
+            write_frame(scenarios, path, 'parquet')
+    chunks = list(read_scenarios(path, chunk_size=5))
+    assert all(0 < len(chunk) <= 5 for chunk in chunks)
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True)[list(scenarios)],
+                                  scenarios, check_exact=format != 'csv', rtol=1e-15)
+
+
+# Results written chunk by chunk are the results of all scenarios at once
+@pytest.mark.parametrize('format', ['csv', 'parquet'])
+def test_run_stream(model, scenarios, tmp_path, format):
+    if format == 'parquet':
+        pytest.importorskip('pyarrow')
+    path = str(tmp_path / ('results.' + format))
+    chunks = [scenarios[lo:lo + 5] for lo in range(0, len(scenarios), 5)]
+    aggregate = run_stream(model, chunks, path, format)
+    written   = pd.read_csv(path) if format == 'csv' else pd.read_parquet(path)
+    expected  = compute_lcoe_batch(model, scenarios)
+    assert list(written['scenario']) == list(expected['scenario'])
+    assert list(written['name']) == list(expected['name'])
+    np.testing.assert_allclose(written[lcoe_cols].to_numpy(), expected[lcoe_cols].to_numpy(),
+                               rtol=1e-13)
+
+    assert aggregate.count == len(scenarios)
+    mean = expected.groupby('name', sort=False)[lcoe_cols].mean().loc[model.names]
+    np.testing.assert_allclose(aggregate.mean.T, mean.to_numpy(), rtol=1e-12)
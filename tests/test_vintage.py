@@ -0,0 +1,53 @@
+# Purpose: Tests of the vintage sweep (vintage.py) against input directories
+# with the years moved by hand.
+
+import os
+import pandas as pd
+import pytest
+from test_golden import check_results
+from load_inputs import load_inputs
+from lcoe_calc import compute_lcoe
+from model import load_model
+from batch import compute_lcoe_batch
+from vintage import sweep
+
+
+# Move the vintage of the inputs in 'path' to come online in 'year' with a
+# plant life of 'life': period_0_yr, start_yr and end_yr of general.csv move,
+# and the calendar-year schedules are held at their last value up to end_yr
+def shift_inputs(path, year, life):
+    general = pd.read_csv(os.path.join(path, 'general.csv'))
+    d = year - 1 - int(general['period_0_yr'][0])
+    general['period_0_yr'] += d
+    general['start_yr'] += d
+    general['end_yr'] = year - 1 + life
+    general.to_csv(os.path.join(path, 'general.csv'), index=False)
+    for f in os.listdir(path):
+        if f in ('CARBON_schedule.csv', 'METHANE_schedule.csv') or f.endswith('fuel_price_schedule.csv'):
+            schedule = pd.read_csv(os.path.join(path, f))
+            last = schedule.columns[-1]
+            for y in range(int(last) + 1, year + life):
+                schedule[str(y)] = schedule[last]
+            schedule.to_csv(os.path.join(path, f), index=False)
+
+
+def vintage(model, year, life=None):
+    output = sweep(model, [year], None if life is None else [life])
+    return output.drop(columns=['scenario', 'Plant life']).reset_index(drop=True)
+
+
+def test_base_vintage(model, golden):
+    year = int(model.general_inputs['period_0_yr']) + 1
+    check_results(vintage(model, year), golden)
+
+
+@pytest.mark.parametrize('year, life', [(2029, 30), (2024, 40), (2024, 20), (2040, 25), (2050, 35)])
+def test_shifted_inputs(model, inputs, year, life):
+    shift_inputs(inputs, year, life)
+    expected = compute_lcoe_batch(load_model(inputs)).drop(columns='scenario')
+    check_results(vintage(model, year, life), expected)
+
+
+def test_lcoe_calc(model, inputs):
+    shift_inputs(inputs, 2029, 30)
+    check_results(vintage(model, 2029, 30), compute_lcoe(load_inputs(inputs)))
@@ -0,0 +1,139 @@
+# Purpose: Vintage sweep: the LCOE of every generation for many online years
+# and plant lives, computed in one batch.
+#
+# lcoe_calc.py computes one vintage: the generations come online in
+# period_0_yr + 1 and operate until end_yr. Moving period_0_yr, start_yr and
+# end_yr by d years moves the whole calculation along, except for the
+# schedules given by calendar year (fuel price, methane and carbon): the
+# construction and depreciation schedules are relative to period_0_yr, and
+# escalation and discounting count from start_yr. So every vintage is
+# computed on the years of the loaded model, with its calendar-year
+# schedules read d years later from the loaded arrays (no input is parsed
+# again). A plant life other than end_yr - period_0_yr ends the operation
+# earlier (model.end_index) or extends the years.
+#
+# Each (online year, plant life) is a copy of the generations in one Model,
+# named '<generation> @ <online year> (<life> years)', so all vintages are
+# evaluated in one pass of the batch engine, and generations whose
+# schedules agree across vintages share their discounted sums.
+# Calendar-year schedules are held at their first and last value outside
+# the years of the inputs.
+
+import argparse
+import itertools
+import numpy as np
+import pandas as pd
+from load_inputs import default_input_dir
+from model import Model, load_model, schedules
+from batch import compute_lcoe_batch, lcoe_cols
+
+
+# Schedules given by calendar year (the others are relative to period_0_yr)
+calendar_schedules = ['fuel_sched', 'meth_sched', 'carb_sched']
+
+
+# Name of the result row of 'name' coming online in 'year' with a plant life of 'life'
+def vintage_name(name, year, life):
+    return '%s @ %d (%d years)' % (name, year, life)
+
+
+# Model of the generations of 'model' for every online year in 'online_years'
+# and plant life in 'lives' (default: end_yr - period_0_yr of the model).
+# Returns the model and a data frame of its result rows: 'row' (the name in
+# the model), 'name' (the generation), 'Online year' and 'Plant life'.
+def vintage_model(model, online_years, lives=None):
+    general = model.general_inputs
+    p0, start = int(general['period_0_yr']), int(general['start_yr'])
+    lives   = [int(general['end_yr']) - p0] if lives is None else [int(life) for life in lives]
+    combos  = list(itertools.product([int(year) for year in online_years], lives))
+    if not combos:
+        raise ValueError('No vintages to evaluate')
+    if min(lives) < 1:
+        raise ValueError('Plant lives must be at least one year')
+
+    # Years of the reference vintage (online in p0 + 1), long enough for the longest life
+    years = np.arange(start, p0 + max(lives) + 1)
+    n_loaded, n_years = len(model.years), len(years)
+    offset = np.array([year - (p0 + 1) for year, _ in combos])
+    life   = np.array([life for _, life in combos])
+
+    # Rows (combination kk, generation ii): the generations in the results
+    # of every combination first, then the other (backup) generations
+    n_names, n_sources = len(model.names), len(model.sources)
+    order  = ([(k, i) for k in range(len(combos)) for i in range(n_names)] +
+              [(k, i) for k in range(len(combos)) for i in range(n_names, n_sources)])
+    kk, ii = np.array(order).T
+    position = np.empty((len(combos), n_sources), dtype=int)
+    position[kk, ii] = np.arange(len(order))
+
+    # Calendar-year schedules of each distinct offset, read from the loaded
+    # years (held at the ends); the others are extended with zeros
+    shifts, vintage = np.unique(offset, return_inverse=True)
+    window = np.clip(shifts[:, None] + np.arange(n_years), 0, n_loaded - 1)
+    sched, rows = {}, {}
+    for k in schedules:
+        loaded = model.schedules[k]
+        if k in calendar_schedules:
+            sched[k] = np.concatenate([loaded[:, w] for w in window])
+            rows[k]  = vintage[kk] * len(loaded) + model.schedule_rows[k][ii]
+        else:
+            sched[k] = np.pad(loaded[:, :n_years], ((0, 0), (0, max(0, n_years - n_loaded))))
+            rows[k]  = model.schedule_rows[k][ii]
+
+    # Fuels with the EIA projection use the price of their start year
+    params = {k: v[ii] for k, v in model.params.items()}
+    fuel   = sched['fuel_sched'][rows['fuel_sched'], 0]
+    params['fl_c'] = np.where(model.shift[ii], fuel, params['fl_c'])
+
+    # Yearly capacity factors of hourly profiles are by calendar year too
+    calendar = np.clip(offset[kk, None] + np.arange(n_years), 0, n_loaded - 1)
+    shift    = lambda a: None if a is None else np.take_along_axis(a[ii], calendar, axis=1)
+
+    names = [vintage_name(model.sources[i], *combos[k]) for k, i in order]
+    backup = np.where(model.backup[ii] >= 0, position[kk, np.maximum(model.backup[ii], 0)], -1)
+    vintages = Model(dict(general, end_yr=int(years[-1])), names[:len(combos) * n_names], names,
+                     years, params, sched, rows, backup,
+                     cf_shape=shift(model.cf_shape), backup_cf_sched=shift(model.backup_cf_sched),
+                     year_offset=offset[kk], end_index=p0 + life[kk] - start)
+
+    n_rows = len(combos) * n_names
+    info = pd.DataFrame({'row': names[:n_rows],
+                         'name': [model.sources[i] for i in ii[:n_rows]],
+                         'Online year': offset[kk[:n_rows]] + p0 + 1,
+                         'Plant life': life[kk[:n_rows]]})
+    return vintages, info
+
+
+# LCOE of the generations of 'model' for every online year and plant life
+# (see vintage_model()), in every scenario of 'scenarios' (see batch.py).
+# Returns a data frame with the columns of all_lcoe_results.csv plus
+# 'scenario' and 'Plant life'.
+def sweep(model, online_years, lives=None, scenarios=None, chunk_size=1024):
+    vintages, info = vintage_model(model, online_years, lives)
+    output = compute_lcoe_batch(vintages, scenarios, chunk_size)
+    output = output.drop(columns=['Online year']).rename(columns={'name': 'row'})
+    output = info.merge(output, on='row', how='right').drop(columns='row')
+    return output[['scenario', 'name', 'Online year', 'Plant life'] + lcoe_cols]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='LCOE of every generation by online year and plant life.')
+    parser.add_argument('--inputs', default=default_input_dir, help='input directory')
+    parser.add_argument('--first', type=int, default=None,
+                        help='first online year (default: period_0_yr + 1)')
+    parser.add_argument('--last', type=int, default=None,
+                        help='last online year (default: the first)')
+    parser.add_argument('--step', type=int, default=1, help='years between vintages')
+    parser.add_argument('--lives', type=int, nargs='+', default=None,
+                        help='plant lives in years (default: end_yr - period_0_yr)')
+    parser.add_argument('-o', '--output', default='vintage_lcoe_results.csv',
+                        help='LCOE results (default: %(default)s)')
+    args = parser.parse_args()
+
+    model = load_model(args.inputs)
+    first = model.general_inputs['period_0_yr'] + 1 if args.first is None else args.first
+    last  = first if args.last is None else args.last
+    output = sweep(model, range(first, last + 1, args.step), args.lives)
+    output.drop(columns='scenario').to_csv(args.output, index=False)
+    print('%d vintages x %d generations written to %s'
+          % (len(output) // len(model.names), len(model.names), args.output))